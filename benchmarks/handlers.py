@@ -0,0 +1,53 @@
+"""Benchmark of the exception handlers.
+
+Run with `python -m benchmarks.handlers`, reports the cost of turning an
+exception into the client end response in microseconds.
+"""
+import time
+from typing import Callable, Dict
+
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.requests import Request
+
+from server.manager.exceptions import RateLimitException, ServerException
+from server.manager.handlers import rate_limit_exception_handler, server_exception_handler, validation_exception_handler
+from server.schemas.tasks import TaskImportSchema
+
+ITERATIONS = 50_000
+
+
+def per_call_us(func: Callable[[], object], iterations: int = ITERATIONS) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+def make_validation_error() -> RequestValidationError:
+    try:
+        TaskImportSchema(title="", priority=1000, project_id="not an uuid")
+    except ValidationError as error:
+        return RequestValidationError(error.raw_errors)
+    raise AssertionError("TaskImportSchema accepted invalid data")
+
+
+def run() -> Dict[str, float]:
+    request = Request({"type": "http", "method": "GET", "path": "/tasks", "headers": [], "query_string": b""})
+    server_exception = ServerException(message="Not found.", code=404)
+    rate_limit_exception = RateLimitException(message="Too many requests.", headers={"Retry-After": "1"})
+    validation_error = make_validation_error()
+    return {
+        "server_exception": per_call_us(lambda: server_exception_handler(request, server_exception)),
+        "rate_limit_exception": per_call_us(lambda: rate_limit_exception_handler(request, rate_limit_exception)),
+        "validation_exception": per_call_us(lambda: validation_exception_handler(request, validation_error)),
+    }
+
+
+def main() -> None:
+    for name, value in run().items():
+        print(f"{name:<24} {value:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""In-process load test of the HTTP endpoints.
+
+Run with `python -m benchmarks.http`. Requests go through the whole ASGI
+application (routing, dependencies, serialization) over httpx's ASGI
+transport, so no sockets or server process take part. The list endpoints
+run against `BENCH_DATABASE_URL` (a migrated PostgreSQL database, rows
+tagged `bench-*` are added when missing) or by default against an
+in-memory SQLite stand-in seeded with `TASKS` rows. Latencies are in
+microseconds.
+"""
+import asyncio
+import os
+import time
+from datetime import timedelta
+from typing import AsyncGenerator, Dict, List
+
+import httpx
+from sqlalchemy import Column, MetaData, Table, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from server.main import app
+from server.manager.db import get_read_session, get_session, to_async_url
+from server.manager.enums import TaskStatus
+from server.manager.limiter import get_rate_limiter
+from server.manager.utils import id_v7, utc_now
+from server.models.tasks import Task
+
+TASKS = 10_000
+REQUESTS = 2_000
+CONCURRENCY = 32
+ENDPOINTS: Dict[str, str] = {
+    "health": "/health",
+    "tasks.list": "/tasks?limit=100",
+    "tasks.list.filtered": "/tasks?status=in_progress&limit=50",
+}
+
+
+def percentile(values: List[int], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))] / 1000
+
+
+async def load(client: httpx.AsyncClient, path: str, *, requests: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[int] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter_ns()
+            response = await client.get(path)
+            latencies.append(time.perf_counter_ns() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} answered {response.status_code}: {response.text[:200]}")
+
+    started = time.perf_counter_ns()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter_ns() - started
+
+    latencies.sort()
+    return {
+        "mean_us": sum(latencies) / len(latencies) / 1000,
+        "p50_us": percentile(latencies, 0.5),
+        "p95_us": percentile(latencies, 0.95),
+        "p99_us": percentile(latencies, 0.99),
+        "wall_us_per_request": wall / requests / 1000,
+    }
+
+
+def get_stand_in_table() -> Table:
+    """The tasks table for SQLite, without the generated search vector
+    (PostgreSQL only, and never loaded by the list endpoints)."""
+    columns = (column for column in Task.__table__.c if column.computed is None)
+    return Table(
+        Task.__tablename__,
+        MetaData(),
+        *(
+            Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+            for column in columns
+        ),
+    )
+
+
+def make_tasks(count: int) -> List[Dict[str, object]]:
+    now = utc_now()
+    statuses = list(TaskStatus)
+    return [
+        {
+            "id": id_v7(),
+            "external_id": f"bench-{index}",
+            "title": f"Benchmark task {index}",
+            "status": statuses[index % len(statuses)].value,
+            "priority": index % 5,
+            "due_at": now + timedelta(hours=index % 500),
+            "created_at": now - timedelta(seconds=index),
+            "updated_at": now - timedelta(seconds=index),
+        }
+        for index in range(count)
+    ]
+
+
+async def get_database() -> AsyncEngine:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if url:
+        engine = create_async_engine(to_async_url(url))
+        async with engine.begin() as connection:
+            statement = pg_insert(Task).on_conflict_do_nothing(index_elements=[Task.external_id])
+            await connection.execute(statement, make_tasks(TASKS))
+        return engine
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    async with engine.begin() as connection:
+        await connection.run_sync(get_stand_in_table().create)
+        await connection.execute(insert(Task), make_tasks(TASKS))
+    return engine
+
+
+async def skip_rate_limit() -> None:
+    """Stands in for the rate limiter, one client sends every request."""
+
+
+async def run() -> Dict[str, Dict[str, float]]:
+    engine = await get_database()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_benchmark_session() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_benchmark_session
+    app.dependency_overrides[get_read_session] = get_benchmark_session
+    app.dependency_overrides[get_rate_limiter()] = skip_rate_limit
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            return {
+                name: await load(client, path, requests=REQUESTS, concurrency=CONCURRENCY)
+                for name, path in ENDPOINTS.items()
+            }
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+        app.dependency_overrides.pop(get_read_session, None)
+        app.dependency_overrides.pop(get_rate_limiter(), None)
+        await engine.dispose()
+
+
+def main() -> None:
+    for name, timings in asyncio.run(run()).items():
+        print(f"{name:<22} " + "  ".join(f"{key} {value:9.1f}" for key, value in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Microbenchmark of the request metrics.
+
+Run with `python -m benchmarks.metrics`, reports in microseconds the cost
+of recording one request and the overhead `MetricsMiddleware` adds to a
+bare ASGI application, plus the cost of rendering `/metrics`.
+"""
+import asyncio
+import time
+from typing import Dict
+
+from starlette.types import Message, Receive, Scope, Send
+
+from server.manager.metrics import Metrics, MetricsMiddleware, merge_snapshots, render_metrics
+
+ITERATIONS = 200_000
+ROUTES = 50
+
+
+class Route:
+    def __init__(self, path: str):
+        self.path = path
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["route"] = scope["benchmark_route"]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b'{"status":"ok"}'})
+
+
+async def receive() -> Message:
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message: Message) -> None:
+    pass
+
+
+async def per_request_us(app, iterations: int = ITERATIONS) -> float:
+    scopes = [
+        {"type": "http", "method": "GET", "path": f"/route-{index}", "benchmark_route": Route(f"/route-{index}")}
+        for index in range(ROUTES)
+    ]
+    started = time.perf_counter_ns()
+    for index in range(iterations):
+        await app(dict(scopes[index % ROUTES]), receive, send)
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+async def run() -> Dict[str, float]:
+    metrics = Metrics()
+    started = time.perf_counter_ns()
+    for index in range(ITERATIONS):
+        metrics.observe_request("GET", "/tasks", 200, index / ITERATIONS, 2_048)
+    observe = (time.perf_counter_ns() - started) / ITERATIONS / 1000
+
+    bare = await per_request_us(application)
+    instrumented = await per_request_us(MetricsMiddleware(application, metrics=Metrics()))
+
+    collected = merge_snapshots([metrics.snapshot()] * 8)
+    started = time.perf_counter_ns()
+    render_metrics(collected)
+    render = (time.perf_counter_ns() - started) / 1000
+    return {
+        "observe_request": observe,
+        "middleware_overhead": instrumented - bare,
+        "render_8_workers": render,
+    }
+
+
+def main() -> None:
+    for name, value in asyncio.run(run()).items():
+        print(f"{name:<22} {value:8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Microbenchmark of the in-process rate limiter.
+
+Run with `python -m benchmarks.ratelimit`, prints the per-check overhead
+in microseconds for both algorithms, for the raw backend call and for the
+whole FastAPI dependency.
+"""
+import asyncio
+import time
+from typing import Callable, Dict
+
+from fastapi import Response
+from starlette.requests import Request
+
+from server.manager.enums import RateLimitAlgorithm, RatePeriod
+from server.manager.exceptions import RateLimitException
+from server.manager.limiter import MemoryBackend, Rate, RateLimiter
+
+ITERATIONS = 200_000
+KEYS = 10_000
+
+
+def per_call_us(func: Callable[[int], object], iterations: int = ITERATIONS) -> float:
+    started = time.perf_counter_ns()
+    for index in range(iterations):
+        func(index)
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+async def per_await_us(func: Callable[[int], object], iterations: int = ITERATIONS) -> float:
+    started = time.perf_counter_ns()
+    for index in range(iterations):
+        try:
+            await func(index)
+        except RateLimitException:
+            pass
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+def make_request(index: int) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/tasks",
+            "headers": [],
+            "query_string": b"",
+            "client": (f"10.0.{index // 256 % 256}.{index % 256}", 40000),
+            "server": ("testserver", 80),
+            "scheme": "http",
+        }
+    )
+
+
+async def run() -> Dict[str, float]:
+    rate = Rate(times=100, period=RatePeriod.SECOND)
+    keys = [f"/tasks:client-{index}" for index in range(KEYS)]
+    buckets, logs = MemoryBackend(max_keys=KEYS), MemoryBackend(max_keys=KEYS)
+
+    results = {
+        "memory.token_bucket": per_call_us(lambda i: buckets.check_token_bucket(keys[i % KEYS], rate=rate)),
+        "memory.sliding_window_log": per_call_us(lambda i: logs.check_sliding_window_log(keys[i % KEYS], rate=rate)),
+    }
+
+    requests = [make_request(index) for index in range(KEYS)]
+    response = Response()
+    for algorithm in RateLimitAlgorithm:
+        limiter = RateLimiter(times=100, period=RatePeriod.SECOND, algorithm=algorithm, backend=MemoryBackend())
+        results[f"dependency.{algorithm.value}"] = await per_await_us(
+            lambda i: limiter(requests[i % KEYS], response), iterations=ITERATIONS // 4
+        )
+    return results
+
+
+def main() -> None:
+    for name, value in asyncio.run(run()).items():
+        print(f"{name:<40} {value:8.3f} us/check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Latency of task search on a million-row fixture.
+
+Run with `python -m benchmarks.search`. Needs `BENCH_DATABASE_URL`, a
+migrated PostgreSQL database (nothing is measured without it): `ROWS`
+tasks tagged `search-bench-*` with generated titles and descriptions are
+copied in when missing and kept for later runs. Requests go through the
+ASGI application like `benchmarks.http`: full-text search (a term in one
+task of ten, a rare term, combined with a filter) and trigram assisted
+`ilike`/`endswith` filters, the latter also with index scans disabled
+for comparison. Latencies are in microseconds.
+"""
+import asyncio
+import os
+import random
+from datetime import timedelta
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Tuple
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.http import load, skip_rate_limit
+from server.main import app
+from server.manager.db import get_read_session, get_session, to_async_url
+from server.manager.enums import TaskStatus
+from server.manager.limiter import get_rate_limiter
+from server.manager.utils import id_v7, utc_now
+
+ROWS = 1_000_000
+BATCH = 20_000
+REQUESTS = 200
+CONCURRENCY = 8
+# terms of one task of ten (title) and one of ten thousand (title and end of description), no generated word matches
+COMMON_TERM = "release"
+RARE_TERM = "migration"
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "qu", "do", "fe", "gi", "ha", "ju", "py")
+ENDPOINTS: Dict[str, str] = {
+    "search.common": f"/tasks/search?q={COMMON_TERM}&limit=20",
+    "search.rare": f"/tasks/search?q={RARE_TERM}&limit=20",
+    "search.filtered": f"/tasks/search?q={COMMON_TERM}&status=todo&limit=20",
+    "search.phrase": f'/tasks/search?q="{COMMON_TERM} {RARE_TERM}"&limit=20',
+}
+FILTER_ENDPOINTS: Dict[str, str] = {
+    "title.ilike": f"/tasks?title__ilike=%25{RARE_TERM}%25&limit=20",
+    "description.endswith": f"/tasks?description__endswith={RARE_TERM}.&limit=20",
+}
+# what the filter endpoints cost without the trigram indexes
+NO_INDEX_SETTINGS = ("SET LOCAL enable_bitmapscan = off", "SET LOCAL enable_indexscan = off")
+
+
+def make_words(count: int, rng: random.Random) -> List[str]:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def iter_records(count: int) -> Iterator[Tuple[Any, ...]]:
+    rng = random.Random(0)
+    words = make_words(5_000, rng)
+    statuses = [status.value for status in TaskStatus]
+    now = utc_now()
+    for index in range(count):
+        title = rng.sample(words, rng.randint(3, 7))
+        description = rng.choices(words, k=rng.randint(15, 40))
+        if index % 10 == 0:
+            title.append(COMMON_TERM)
+        if index % 10_000 == 0:
+            title.append(RARE_TERM)
+            description.append(RARE_TERM)
+        created_at = now - timedelta(seconds=index)
+        yield (
+            id_v7(),
+            f"search-bench-{index}",
+            " ".join(title),
+            " ".join(description) + ".",
+            statuses[index % len(statuses)],
+            index % 5,
+            created_at,
+            created_at,
+        )
+
+
+async def seed(url: str) -> None:
+    import asyncpg
+
+    connection = await asyncpg.connect(url.replace("postgresql+asyncpg://", "postgresql://"))
+    try:
+        if await connection.fetchval("SELECT 1 FROM tasks WHERE external_id = $1", f"search-bench-{ROWS - 1}"):
+            return
+        columns = ["id", "external_id", "title", "description", "status", "priority", "created_at", "updated_at"]
+        records = iter_records(ROWS)
+        # one transaction, so that the last row only exists once all of them do
+        async with connection.transaction():
+            await connection.execute("DELETE FROM tasks WHERE external_id LIKE 'search-bench-%'")
+            for _ in range(0, ROWS, BATCH):
+                batch = [next(records) for _ in range(BATCH)]
+                await connection.copy_records_to_table("tasks", records=batch, columns=columns)
+        await connection.execute("ANALYZE tasks")
+    finally:
+        await connection.close()
+
+
+async def measure(engine: AsyncEngine, endpoints: Dict[str, str], *settings: str) -> Dict[str, Dict[str, float]]:
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_benchmark_session() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as session:
+            for statement in settings:
+                await session.execute(text(statement))
+            yield session
+
+    app.dependency_overrides[get_session] = get_benchmark_session
+    app.dependency_overrides[get_read_session] = get_benchmark_session
+    app.dependency_overrides[get_rate_limiter()] = skip_rate_limit
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            return {
+                name: await load(client, path, requests=REQUESTS, concurrency=CONCURRENCY)
+                for name, path in endpoints.items()
+            }
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+        app.dependency_overrides.pop(get_read_session, None)
+        app.dependency_overrides.pop(get_rate_limiter(), None)
+
+
+async def run() -> Dict[str, Dict[str, float]]:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        return {}
+
+    await seed(url)
+    engine = create_async_engine(to_async_url(url))
+    try:
+        results = await measure(engine, {**ENDPOINTS, **FILTER_ENDPOINTS})
+        no_index = await measure(engine, FILTER_ENDPOINTS, *NO_INDEX_SETTINGS)
+        results.update({f"{name}.no_index": timings for name, timings in no_index.items()})
+        return results
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    results = asyncio.run(run())
+    if not results:
+        print("Set BENCH_DATABASE_URL to a migrated PostgreSQL database.")
+    for name, timings in results.items():
+        print(f"{name:<30} " + "  ".join(f"{key} {value:11.1f}" for key, value in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark of password hashing and JWT handling.
+
+Run with `python -m benchmarks.security`, reports the cost of one call in
+microseconds. Hashing uses the configured algorithms, so it's slow by
+design and only a few calls are timed; tokens are read both with a cold
+verification cache (every token new) and a warm one.
+"""
+import time
+from typing import Callable, Dict
+
+from server.manager.security import PasswordManager, TokenManager, get_verified_token_cache
+
+HASH_ITERATIONS = 10
+TOKEN_ITERATIONS = 5_000
+
+
+def per_call_us(func: Callable[[int], object], iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for index in range(iterations):
+        func(index)
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+def run() -> Dict[str, Dict[str, float]]:
+    salt = PasswordManager.generate_salt()
+    hashed = PasswordManager.make_password(password="correct horse battery staple", hash_salt=salt)
+    tokens = [TokenManager.create_code(data={"sub": str(index)}) for index in range(TOKEN_ITERATIONS)]
+    cache = get_verified_token_cache()
+
+    password = {
+        "generate_salt": per_call_us(lambda _: PasswordManager.generate_salt(), HASH_ITERATIONS),
+        "make_password": per_call_us(
+            lambda _: PasswordManager.make_password(password="correct horse battery staple", hash_salt=salt),
+            HASH_ITERATIONS,
+        ),
+        "verify_password": per_call_us(
+            lambda _: PasswordManager.verify_password(
+                password="correct horse battery staple", hash_salt=salt, hashed_password=hashed
+            ),
+            HASH_ITERATIONS,
+        ),
+    }
+
+    cache.clear()
+    token = {
+        "create_code": per_call_us(lambda i: TokenManager.create_code(data={"sub": str(i)}), TOKEN_ITERATIONS),
+        "read_code.cold": per_call_us(lambda i: TokenManager.read_code(code=tokens[i]), TOKEN_ITERATIONS),
+        "read_code.warm": per_call_us(lambda i: TokenManager.read_code(code=tokens[i]), TOKEN_ITERATIONS),
+    }
+    cache.clear()
+    return {"password": password, "token": token}
+
+
+def main() -> None:
+    for group, timings in run().items():
+        for name, value in timings.items():
+            print(f"{group}.{name:<20} {value:12.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark of the response serialization paths.
+
+Run with `python -m benchmarks.serialization`, compares building the
+client end structure through `ClientOutSchema` + `jsonable_encoder` (what
+FastAPI does for a returned model) with `EnvelopeResponse` for 1, 100 and
+10k objects.
+"""
+import time
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import Field
+
+from server.manager.responses import EnvelopeResponse
+from server.manager.schemas import BaseOutSchema, ClientOutSchema, WriteHistoryOutSchema
+from server.manager.types import StringUUID
+from server.manager.utils import utc_now
+
+SIZES = (1, 100, 10_000)
+
+
+class ItemOutSchema(BaseOutSchema, WriteHistoryOutSchema):
+    id: StringUUID
+    title: str
+    status: str
+    assignee_id: StringUUID = Field(default=None)
+
+
+def make_rows(size: int) -> List[Dict[str, Any]]:
+    now = utc_now()
+    return [
+        {
+            "id": uuid4(),
+            "title": f"Task {index}",
+            "status": "todo",
+            "assignee_id": uuid4(),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(size)
+    ]
+
+
+def timed_us(func: Callable[[], object], size: int) -> float:
+    repeat = max(3, 20_000 // size)
+    started = time.perf_counter_ns()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter_ns() - started) / repeat / 1000
+
+
+def run() -> Dict[str, Dict[str, float]]:
+    schema = ClientOutSchema[List[ItemOutSchema]]
+    results = {}
+    for size in SIZES:
+        rows = make_rows(size)
+        models = [ItemOutSchema(**row) for row in rows]
+        results[str(size)] = {
+            "client_out_schema": timed_us(
+                lambda: ORJSONResponse(content=jsonable_encoder(schema(data=rows, message="Tasks."))).body, size
+            ),
+            "envelope_models": timed_us(lambda: EnvelopeResponse(models, message="Tasks.").body, size),
+            "envelope_rows": timed_us(lambda: EnvelopeResponse(rows, message="Tasks.").body, size),
+        }
+    return results
+
+
+def main() -> None:
+    for size, timings in run().items():
+        baseline = timings["client_out_schema"]
+        for name, value in timings.items():
+            print(f"{size:>6} objects  {name:<20} {value:12.1f} us  x{baseline / value:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Runs the benchmark modules and compares their results with a baseline.
+
+Used by `python manage.py bench`. Every benchmark module exposes `run()`
+(sync or async) returning timings, nested dicts are flattened to dotted
+names such as `security.token.read_code.warm`. All results (timings,
+sizes) are lower is better, so a result is a regression when it exceeds
+its baseline by more than the tolerance.
+"""
+import asyncio
+import importlib
+import inspect
+import platform
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+BENCHMARKS: Dict[str, str] = {
+    "security": "benchmarks.security",
+    "types": "benchmarks.types",
+    "serialization": "benchmarks.serialization",
+    "encoders": "benchmarks.encoders",
+    "handlers": "benchmarks.handlers",
+    "ratelimit": "benchmarks.ratelimit",
+    "metrics": "benchmarks.metrics",
+    "uuids": "benchmarks.uuids",
+    "http": "benchmarks.http",
+    "search": "benchmarks.search",
+    "scheduler": "benchmarks.scheduler",
+}
+
+
+class Regression(NamedTuple):
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1
+
+
+def flatten(results: Dict[Any, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix=f"{name}."))
+        else:
+            flat[name] = float(value)
+    return flat
+
+
+def run_benchmark(name: str) -> Dict[str, float]:
+    result = importlib.import_module(BENCHMARKS[name]).run()
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return flatten(result, prefix=f"{name}.")
+
+
+def run(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Run the given benchmarks (all of them by default) one after another."""
+    results: Dict[str, float] = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark {name!r}, expected one of {', '.join(BENCHMARKS)}.")
+        results.update(run_benchmark(name))
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "timestamp": int(time.time())},
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[Regression]:
+    """Results slower than their baseline by more than `tolerance` (0.2 is
+    20 %), benchmarks missing on either side are skipped."""
+    return [
+        Regression(name, baseline[name], value)
+        for name, value in results.items()
+        if baseline.get(name) and value > baseline[name] * (1 + tolerance)
+    ]
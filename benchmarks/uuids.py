@@ -0,0 +1,75 @@
+"""Benchmark of primary key generation and storage.
+
+Run with `python -m benchmarks.uuids`. Reports the cost of generating an
+id in microseconds and, when `BENCH_DATABASE_URL` points at a PostgreSQL
+database, the insert cost per row (microseconds, COPY in batches, primary
+key index maintained) and the primary key index size per row (bytes) of
+random UUIDv4 keys stored as text, random UUIDv4 keys stored as `uuid` and
+time ordered UUIDv7 keys stored as `uuid`. The tables are dropped after.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict
+from uuid import uuid4
+
+from server.manager.utils import id_v4, id_v7
+
+GENERATE_ITERATIONS = 200_000
+ROWS = 1_000_000
+BATCH = 10_000
+VARIANTS: Dict[str, Any] = {
+    "text_v4": ("text", id_v4),
+    "uuid_v4": ("uuid", uuid4),
+    "uuid_v7": ("uuid", id_v7),
+}
+
+
+def per_call_us(func: Callable[[], object], iterations: int = GENERATE_ITERATIONS) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - started) / iterations / 1000
+
+
+async def measure_storage(url: str) -> Dict[str, Dict[str, float]]:
+    import asyncpg
+
+    connection = await asyncpg.connect(url.replace("postgresql+asyncpg://", "postgresql://"))
+    insert, index = {}, {}
+    try:
+        for name, (column_type, generate) in VARIANTS.items():
+            table = f"benchmark_keys_{name}"
+            await connection.execute(f"DROP TABLE IF EXISTS {table}")
+            await connection.execute(f"CREATE TABLE {table} (id {column_type} PRIMARY KEY, position integer NOT NULL)")
+            elapsed = 0
+            for offset in range(0, ROWS, BATCH):
+                records = [(generate(), position) for position in range(offset, offset + BATCH)]
+                started = time.perf_counter_ns()
+                await connection.copy_records_to_table(table, records=records, columns=["id", "position"])
+                elapsed += time.perf_counter_ns() - started
+            size = await connection.fetchval("SELECT pg_relation_size($1::regclass)", f"{table}_pkey")
+            await connection.execute(f"DROP TABLE {table}")
+            insert[name] = elapsed / ROWS / 1000
+            index[name] = size / ROWS
+    finally:
+        await connection.close()
+    return {"insert_us_per_row": insert, "index_bytes_per_row": index}
+
+
+def run() -> Dict[str, Dict[str, float]]:
+    results = {"generate": {"id_v4_text": per_call_us(id_v4), "id_v7": per_call_us(id_v7)}}
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if url:
+        results.update(asyncio.run(measure_storage(url)))
+    return results
+
+
+def main() -> None:
+    for group, values in run().items():
+        for name, value in values.items():
+            print(f"{group:<20} {name:<12} {value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
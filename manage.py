@@ -1,15 +1,233 @@
+import asyncio
 import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional
 
+import orjson
+import typer
 import uvicorn
 from typer import Typer
 
+from server.manager.supervisor import PreforkSupervisor, get_worker_count
+
 app = Typer()
 
 
 @app.command(name="startserver")
-def start_server(mode: str = "development"):
+def start_server(
+    mode: str = "development",
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: str = typer.Option("1", help="Number of worker processes, 'auto' starts one per CPU core."),
+    keep_alive: int = typer.Option(5, help="Seconds an idle keep-alive connection is kept open."),
+    backlog: int = typer.Option(2048, help="Maximum number of connections waiting to be accepted."),
+    limit_concurrency: Optional[int] = typer.Option(None, help="Connections per worker before answering 503."),
+    limit_max_requests: Optional[int] = typer.Option(None, help="Requests a worker serves before it is replaced."),
+    max_requests_jitter: int = typer.Option(
+        0, help="Random extra requests per worker so that they don't recycle at once."
+    ),
+):
+    """Run the API, with auto reload in development and pre-forked
+    uvloop/httptools workers otherwise."""
+    os.environ["MODE"] = mode
+    if mode == "development":
+        uvicorn.run("server.main:app", host=host, port=port, reload=True)
+        return
+
+    options = {
+        "host": host,
+        "port": port,
+        "loop": "uvloop",
+        "http": "httptools",
+        "proxy_headers": True,
+        "timeout_keep_alive": keep_alive,
+        "backlog": backlog,
+        "limit_concurrency": limit_concurrency,
+        "limit_max_requests": limit_max_requests,
+    }
+    from server.manager.metrics import clear_snapshots
+
+    # counters restart from zero with the server, snapshots of the previous run's workers would be summed in
+    clear_snapshots()
+    worker_count = get_worker_count(workers)
+    if not hasattr(os, "fork"):
+        # no pre-forking on this platform, uvicorn spawns the workers (they are not replaced once they exit)
+        uvicorn.run("server.main:app", workers=worker_count, **options)
+        return
+
+    config = uvicorn.Config("server.main:app", **options)
+    PreforkSupervisor(config, workers=worker_count, max_requests_jitter=max_requests_jitter).run()
+
+
+@app.command(name="import-tasks")
+def import_tasks(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, readable=True),
+    import_format: Optional[str] = typer.Option(None, "--format", help="ndjson or csv, guessed from the file suffix."),
+    chunk_size: Optional[int] = typer.Option(None, help="Records per transaction (IMPORT_CHUNK_SIZE by default)."),
+    mode: str = "development",
+):
+    """Stream tasks from an NDJSON or CSV file into the database."""
+    os.environ["MODE"] = mode
+    # server modules are imported by the commands that need them, so the other commands start fast
+    from server.manager.db import get_engine
+    from server.manager.enums import ImportFormat
+    from server.manager.importer import get_import_format, iter_file_chunks
+    from server.routes.tasks import get_task_importer
+
+    async def run():
+        task_importer = get_task_importer()
+        if chunk_size:
+            task_importer.chunk_size = chunk_size
+        try:
+            report = await task_importer.run(
+                iter_file_chunks(path),
+                import_format=ImportFormat(import_format) if import_format else get_import_format(filename=path.name),
+            )
+        finally:
+            await get_engine().dispose()
+        return report
+
+    report = asyncio.run(run())
+    typer.echo(orjson.dumps(report.dict(), option=orjson.OPT_INDENT_2).decode(encoding="utf-8"))
+
+
+@app.command(name="startup-profile")
+def startup_profile(
+    module: str = typer.Option("server.main", help="Module whose import is profiled."),
+    top: int = typer.Option(25, help="Number of slowest imports listed."),
+    path: str = typer.Option("/health", help="Path of the first request."),
+    budget_ms: Optional[float] = typer.Option(None, help="Fail when import plus first request takes longer."),
+    mode: str = "development",
+):
+    """Report per-module import times and time to first request, both
+    measured in fresh interpreters."""
+    env = {**os.environ, "MODE": mode}
+    imports = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env, capture_output=True, text=True
+    )
+    if imports.returncode:
+        typer.echo(imports.stderr, err=True)
+        raise typer.Exit(code=imports.returncode)
+
+    from server.manager.startup import parse_import_times
+
+    times = parse_import_times(imports.stderr)
+    typer.echo(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for item in sorted(times, key=lambda item: item.cumulative_us, reverse=True)[:top]:
+        typer.echo(f"{item.cumulative_us / 1000:14.1f} {item.self_us / 1000:9.1f}  {'  ' * item.depth}{item.module}")
+
+    first_request = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            (
+                "import orjson; from server.manager.startup import measure_first_request; "
+                f"print(orjson.dumps(measure_first_request(path={path!r})).decode())"
+            ),
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if first_request.returncode:
+        typer.echo(first_request.stderr, err=True)
+        raise typer.Exit(code=first_request.returncode)
+
+    timings = orjson.loads(first_request.stdout.strip().splitlines()[-1])
+    typer.echo("")
+    for name, value in timings.items():
+        typer.echo(f"{name:<18} {value:10.1f}")
+    if budget_ms is not None and timings["total_ms"] > budget_ms:
+        typer.echo(f"Startup took {timings['total_ms']:.1f} ms, over the {budget_ms:.1f} ms budget.", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command(name="check-plans")
+def check_plans(mode: str = "development"):
+    """Fail when a task list query can't be served by an index, or a cursor
+    page filters the rows before its cursor, checked with EXPLAIN on the
+    migrated database."""
+    os.environ["MODE"] = mode
+    from server.manager.db import get_engine
+    from server.manager.plans import check_index_scans
+    from server.routes.tasks import get_plan_checks
+
+    checks = get_plan_checks()
+
+    async def run():
+        try:
+            async with get_engine().connect() as connection:
+                return await check_index_scans(connection, checks, tables=["tasks"])
+        finally:
+            await get_engine().dispose()
+
+    failures = asyncio.run(run())
+    for name in checks:
+        typer.echo(f"{name:<20} {'; '.join(failures[name]) if name in failures else 'index scan'}")
+    if failures:
+        raise typer.Exit(code=1)
+
+
+@app.command(name="refresh-stats")
+def refresh_stats(
+    rebuild: bool = typer.Option(False, help="Count every task again instead of the changes since the last refresh."),
+    mode: str = "development",
+):
+    """Fold the task changes into the statistics rollup, for deployments
+    that refresh it from cron (TASK_STATS_REFRESH_SECONDS=0)."""
     os.environ["MODE"] = mode
-    uvicorn.run("server.main:app", host="0.0.0.0", port=8000, reload=True)
+    from server.manager.db import get_engine
+    from server.manager.rollups import get_task_stats_rollup
+
+    async def run():
+        rollup = get_task_stats_rollup()
+        try:
+            return await (rollup.rebuild() if rebuild else rollup.refresh())
+        finally:
+            await get_engine().dispose()
+
+    count = asyncio.run(run())
+    if count is None:
+        typer.echo("Another refresh is running, nothing done.")
+    else:
+        typer.echo(f"Folded {count} changed tasks into the statistics.")
+
+
+@app.command(name="bench")
+def bench(
+    only: Optional[List[str]] = typer.Option(None, help="Benchmarks to run (all by default), may be repeated."),
+    output: Path = typer.Option(Path(".benchmarks/latest.json"), help="Where the results are written."),
+    baseline: Path = typer.Option(Path(".benchmarks/baseline.json"), help="Results the run is compared against."),
+    tolerance: float = typer.Option(0.2, help="Allowed slowdown against the baseline, 0.2 is 20 %."),
+    save_baseline: bool = typer.Option(False, help="Store the results as the new baseline."),
+    mode: str = "development",
+):
+    """Run the benchmark suite and fail on regressions against the baseline."""
+    os.environ["MODE"] = mode
+    from benchmarks.suite import compare, run
+
+    report = run(only)
+    for name, value in report["results"].items():
+        typer.echo(f"{name:<52} {value:12.3f}")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    if save_baseline:
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        typer.echo(f"Saved the baseline to {baseline}.")
+        return
+    if not baseline.exists():
+        typer.echo(f"No baseline at {baseline}, run with --save-baseline to create one.")
+        return
+
+    regressions = compare(report["results"], orjson.loads(baseline.read_bytes())["results"], tolerance)
+    for item in regressions:
+        typer.echo(f"{item.name}: {item.baseline:.3f} -> {item.current:.3f} ({item.change:+.0%})", err=True)
+    if regressions:
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
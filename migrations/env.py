@@ -2,8 +2,11 @@ from logging.config import fileConfig
 from pathlib import Path
 
 from alembic import context
+from sqlalchemy import create_engine
 
-from server.manager.db import Base, engine
+import server.models  # noqa: F401
+from server.config.factory import settings
+from server.manager.db import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -65,7 +68,8 @@ def run_migrations_online() -> None:
     """
     connectable = context.config.attributes.get("connection", None)
     if connectable is None:
-        connectable = engine
+        # migrations run from the CLI with a blocking driver, the application itself only uses the async engine
+        connectable = create_engine(url=settings.RDS_URL)
 
     with connectable.connect() as connection:
         context.configure(
@@ -0,0 +1,42 @@
+"""rate limit tables
+
+Revision ID: 5b2e8c41d7a3
+Revises:
+Create Date: 2026-10-18 09:12:40.318252+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b2e8c41d7a3"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("tokens", sa.Double(), nullable=False),
+        sa.Column("allowed", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(op.f("ix_rate_limit_buckets_updated_at"), "rate_limit_buckets", ["updated_at"], unique=False)
+    op.create_table(
+        "rate_limit_hits",
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=False), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("hit_at", sa.Double(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_rate_limit_hits_key_hit_at", "rate_limit_hits", ["key", "hit_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rate_limit_hits_key_hit_at", table_name="rate_limit_hits")
+    op.drop_table("rate_limit_hits")
+    op.drop_index(op.f("ix_rate_limit_buckets_updated_at"), table_name="rate_limit_buckets")
+    op.drop_table("rate_limit_buckets")
@@ -0,0 +1,51 @@
+"""uuid v7 defaults
+
+Revision ID: a6d8f0b3c215
+Revises: e7a3c9d15b42
+Create Date: 2026-10-18 16:40:52.118904+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a6d8f0b3c215"
+down_revision = "e7a3c9d15b42"
+branch_labels = None
+depends_on = None
+
+TABLES = ("tasks", "projects", "assignees")
+
+
+def upgrade() -> None:
+    # unix time in milliseconds over the first 48 bits of a random uuid, with the version bits turned from 4 to 7;
+    # used by rows that get their id from the database (e.g. bulk imports), the application generates its own
+    op.execute("""
+        CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid
+        LANGUAGE sql VOLATILE PARALLEL SAFE AS $$
+            SELECT encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            PLACING substring(
+                                int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3
+                            )
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid
+        $$
+        """)
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=sa.text("uuid_generate_v7()"))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=sa.text("gen_random_uuid()"))
+    op.execute("DROP FUNCTION uuid_generate_v7()")
@@ -0,0 +1,68 @@
+"""task search
+
+Revision ID: b3f9e1c7a540
+Revises: a6d8f0b3c215
+Create Date: 2026-10-18 18:12:37.530216+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "b3f9e1c7a540"
+down_revision = "a6d8f0b3c215"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A')"
+    " || setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # a stored generated column rewrites the table under an exclusive lock, schedule it off-peak on large tables
+    op.add_column(
+        "tasks",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_search_vector",
+            "tasks",
+            ["search_vector"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_tasks_title_trgm",
+            "tasks",
+            ["title"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_tasks_description_trgm",
+            "tasks",
+            ["description"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_tasks_description_trgm", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_title_trgm", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_search_vector", table_name="tasks", postgresql_concurrently=True)
+
+    op.drop_column("tasks", "search_vector")
+    # the extension is left installed, other databases objects may depend on it
@@ -0,0 +1,60 @@
+"""task stats rollup
+
+Revision ID: d2c8a4f6e913
+Revises: b3f9e1c7a540
+Create Date: 2026-10-18 19:25:03.817462+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d2c8a4f6e913"
+down_revision = "b3f9e1c7a540"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "task_stats",
+        sa.Column("period", sa.String(length=10), nullable=False),
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("project_id", sa.Uuid(), nullable=False),
+        sa.Column("created", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("completed", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("period", "bucket", "project_id"),
+    )
+    op.create_index(
+        "ix_task_stats_period_project_id_bucket", "task_stats", ["period", "project_id", "bucket"], unique=False
+    )
+    op.create_table(
+        "task_stats_entries",
+        sa.Column("task_id", sa.Uuid(), nullable=False),
+        sa.Column("project_id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("task_id"),
+    )
+    # no watermark yet, the first refresh counts every task
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_tasks_updated_at"), "tasks", ["updated_at"], unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f("ix_tasks_updated_at"), table_name="tasks", postgresql_concurrently=True)
+
+    op.drop_table("rollup_watermarks")
+    op.drop_table("task_stats_entries")
+    op.drop_index("ix_task_stats_period_project_id_bucket", table_name="task_stats")
+    op.drop_table("task_stats")
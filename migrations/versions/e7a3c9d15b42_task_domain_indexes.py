@@ -0,0 +1,112 @@
+"""task domain indexes
+
+Revision ID: e7a3c9d15b42
+Revises: c41f6e2a8b97
+Create Date: 2026-10-18 15:02:11.406733+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e7a3c9d15b42"
+down_revision = "c41f6e2a8b97"
+branch_labels = None
+depends_on = None
+
+OPEN_STATUSES = ("todo", "in_progress")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "projects",
+        sa.Column("id", sa.Uuid(as_uuid=False), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "assignees",
+        sa.Column("id", sa.Uuid(as_uuid=False), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_assignees_email"), "assignees", ["email"], unique=True)
+
+    # imported tasks already reference projects and assignees, they get a row named after their id
+    op.execute(
+        "INSERT INTO projects (id, name) SELECT DISTINCT project_id, project_id::text FROM tasks"
+        " WHERE project_id IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO assignees (id, name) SELECT DISTINCT assignee_id, assignee_id::text FROM tasks"
+        " WHERE assignee_id IS NOT NULL"
+    )
+    # NOT VALID only takes a short lock, existing rows are checked by VALIDATE once that lock is released
+    op.execute(
+        "ALTER TABLE tasks ADD CONSTRAINT tasks_project_id_fkey FOREIGN KEY (project_id) REFERENCES projects (id)"
+        " ON DELETE SET NULL NOT VALID"
+    )
+    op.execute(
+        "ALTER TABLE tasks ADD CONSTRAINT tasks_assignee_id_fkey FOREIGN KEY (assignee_id) REFERENCES assignees (id)"
+        " ON DELETE SET NULL NOT VALID"
+    )
+
+    # CONCURRENTLY can't run in a transaction, and doesn't block writes to the table while building
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE tasks VALIDATE CONSTRAINT tasks_project_id_fkey")
+        op.execute("ALTER TABLE tasks VALIDATE CONSTRAINT tasks_assignee_id_fkey")
+        op.create_index(
+            "ix_tasks_assignee_id_status_due_at",
+            "tasks",
+            ["assignee_id", "status", "due_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_tasks_open_assignee_id_due_at",
+            "tasks",
+            ["assignee_id", "due_at", "id"],
+            unique=False,
+            postgresql_where=sa.column("status").in_(OPEN_STATUSES),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_tasks_project_id_updated_at_id",
+            "tasks",
+            ["project_id", "updated_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_tasks_status_created_at_id",
+            "tasks",
+            ["status", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # leading columns of the composite indexes above
+        op.drop_index("ix_tasks_assignee_id", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_project_id", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_status", table_name="tasks", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index("ix_tasks_status", "tasks", ["status"], unique=False, postgresql_concurrently=True)
+        op.create_index("ix_tasks_project_id", "tasks", ["project_id"], unique=False, postgresql_concurrently=True)
+        op.create_index("ix_tasks_assignee_id", "tasks", ["assignee_id"], unique=False, postgresql_concurrently=True)
+        op.drop_index("ix_tasks_status_created_at_id", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_project_id_updated_at_id", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_open_assignee_id_due_at", table_name="tasks", postgresql_concurrently=True)
+        op.drop_index("ix_tasks_assignee_id_status_due_at", table_name="tasks", postgresql_concurrently=True)
+
+    op.drop_constraint("tasks_assignee_id_fkey", "tasks", type_="foreignkey")
+    op.drop_constraint("tasks_project_id_fkey", "tasks", type_="foreignkey")
+    op.drop_index(op.f("ix_assignees_email"), table_name="assignees")
+    op.drop_table("assignees")
+    op.drop_table("projects")
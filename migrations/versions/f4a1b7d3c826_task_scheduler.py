@@ -0,0 +1,41 @@
+"""task scheduler
+
+Revision ID: f4a1b7d3c826
+Revises: d2c8a4f6e913
+Create Date: 2026-10-18 20:41:18.260935+00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f4a1b7d3c826"
+down_revision = "d2c8a4f6e913"
+branch_labels = None
+depends_on = None
+
+OPEN_STATUSES = ("todo", "in_progress")
+
+
+def upgrade() -> None:
+    # nullable columns without default, no table rewrite; past due open tasks get their overdue event on first run
+    op.add_column("tasks", sa.Column("reminded_for", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("tasks", sa.Column("overdue_for", sa.DateTime(timezone=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_open_due_at",
+            "tasks",
+            ["due_at"],
+            unique=False,
+            postgresql_where=sa.column("status").in_(OPEN_STATUSES),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_tasks_open_due_at", table_name="tasks", postgresql_concurrently=True)
+
+    op.drop_column("tasks", "overdue_for")
+    op.drop_column("tasks", "reminded_for")
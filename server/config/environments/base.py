@@ -1,5 +1,9 @@
+from typing import List, Union
+
 from pydantic import BaseSettings, Extra, PostgresDsn
 
+from server.manager.enums import HashingPoolType, RateLimitBackendType, RatePeriod
+
 
 class AppConfig(BaseSettings):
     class Config:
@@ -17,6 +21,9 @@ class BaseConfig(AppConfig):
     HASHING_ALGORITHM_LAYER_1: str
     HASHING_ALGORITHM_LAYER_2: str
     HASHING_SALT: str
+    HASHING_POOL_TYPE: HashingPoolType = HashingPoolType.THREAD
+    HASHING_POOL_WORKERS: int = 0
+    HASHING_POOL_MAX_QUEUE: int = 0
 
     # token
     JWT_SECRET_KEY: str
@@ -26,6 +33,51 @@ class BaseConfig(AppConfig):
     TOKEN_LIFETIME_MINUTES: int
     TOKEN_LIFETIME_HOURS: int
     TOKEN_LIFETIME_DAYS: int
+    TOKEN_CACHE_SIZE: int = 10_000
+    REVOCATION_ENABLED: bool = False
+    REVOCATION_SYNC_SECONDS: float = 5.0
+    REVOCATION_REBUILD_SECONDS: float = 300.0
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
 
     # database
     RDS_URL: PostgresDsn
+    RDS_REPLICA_URLS: List[PostgresDsn] = []
+    DB_REPLICA_EJECT_SECONDS: float = 30.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    QUERY_PROFILER: bool = False
+    QUERY_SLOW_MS: float = 100.0
+    QUERY_N_PLUS_ONE_THRESHOLD: int = 10
+
+    # rate limiting
+    RATE_LIMIT_BACKEND: RateLimitBackendType = RateLimitBackendType.MEMORY
+    RATE_LIMIT_SHARDS: int = 64
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_TIMES: int = 1_000
+    RATE_LIMIT_PERIOD: RatePeriod = RatePeriod.MINUTE
+
+    # bulk import
+    IMPORT_CHUNK_SIZE: int = 5_000
+    IMPORT_MAX_ERRORS: int = 1_000
+
+    # streaming export
+    EXPORT_YIELD_PER: int = 1_000
+
+    # task statistics rollup, 0 disables the refresh loop of the workers (e.g. refreshed by cron instead)
+    TASK_STATS_REFRESH_SECONDS: float = 60.0
+    TASK_STATS_OVERLAP_SECONDS: float = 60.0
+
+    # task scheduler, 0 disables it
+    TASK_SCHEDULER_SYNC_SECONDS: float = 5.0
+    TASK_SCHEDULER_WINDOW_SECONDS: float = 600.0
+    TASK_SCHEDULER_MAX_ITEMS: int = 100_000
+    TASK_REMINDER_SECONDS: float = 900.0
+
+    # metrics
+    METRICS_DIR: Union[str, None] = None
+    METRICS_FLUSH_SECONDS: float = 5.0
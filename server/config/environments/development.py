@@ -4,6 +4,7 @@ from server.config.environments.base import BaseConfig
 class DevelopmentConfig(BaseConfig):
     DEBUG: bool = True
     MODE: str = "development"
+    QUERY_PROFILER: bool = True
 
     class Config:
         env_file = "configurations/.env.development"
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Any
 
 from decouple import config
 
@@ -27,4 +28,12 @@ def get_settings() -> BaseConfig:
     return factory()
 
 
-settings: BaseConfig = get_settings()
+class LazySettings:
+    """Stand-in for the settings that builds them on first attribute access,
+    so importing a module doesn't read the environment and `.env` file."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+
+settings: BaseConfig = LazySettings()  # type: ignore[assignment]
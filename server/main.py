@@ -1,8 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
+
+from server.config.factory import settings
+from server.manager.db import ReadYourWritesMiddleware
+from server.manager.exceptions import RateLimitException, ServerException
+from server.manager.handlers import rate_limit_exception_handler, server_exception_handler, validation_exception_handler
+from server.manager.limiter import RateLimitHeadersMiddleware
+from server.manager.metrics import CONTENT_TYPE, MetricsMiddleware, collect_metrics, render_metrics, run_snapshot_writer
+from server.manager.profiler import QueryProfilerMiddleware
+from server.manager.revocation import get_revocation_list
+from server.manager.rollups import get_task_stats_rollup
+from server.manager.scheduler import get_task_scheduler
+from server.manager.security import get_hashing_pool
+from server.manager.startup import warm_up
+from server.routes import projects, tasks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    warm_up()
+    background_tasks = []
+    if settings.REVOCATION_ENABLED:
+        background_tasks.append(asyncio.create_task(get_revocation_list().run()))
+    if settings.METRICS_DIR:
+        background_tasks.append(asyncio.create_task(run_snapshot_writer()))
+    if settings.TASK_STATS_REFRESH_SECONDS:
+        background_tasks.append(asyncio.create_task(get_task_stats_rollup().run()))
+    if settings.TASK_SCHEDULER_SYNC_SECONDS:
+        background_tasks.append(asyncio.create_task(get_task_scheduler().run()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    get_hashing_pool().shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_exception_handler(ServerException, server_exception_handler)
+app.add_exception_handler(RateLimitException, rate_limit_exception_handler)
+app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.include_router(tasks.router)
+app.include_router(projects.router)
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(collect_metrics()), media_type=CONTENT_TYPE)
@@ -0,0 +1,114 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Type, TypeVar, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+from sqlalchemy import Row
+
+from server.manager.types import NativeUUID, StringUUID, Timestamp
+from server.manager.utils import get_timestamp, get_utc_timezone
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+Converter = Callable[[Any], Any]
+Builder = Callable[[Any], Any]
+
+MISSING = object()
+_builders: Dict[Type[BaseModel], Builder] = {}
+
+
+def timestamp_converter(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return get_timestamp(v if v.tzinfo is not None else v.replace(tzinfo=get_utc_timezone()))
+    return v
+
+
+def string_uuid_converter(v: Any) -> Any:
+    return str(v) if isinstance(v, UUID) else v
+
+
+def native_uuid_converter(v: Any) -> Any:
+    return v if v is None or isinstance(v, UUID) else NativeUUID.validate(v)
+
+
+def enum_value_converter(v: Any) -> Any:
+    return v.value if isinstance(v, Enum) else v
+
+
+def _nested_converter(model: Type[BaseModel], shape: int) -> Converter:
+    def convert_one(v: Any) -> Any:
+        return v if v is None or isinstance(v, model) else get_trusted_builder(model)(v)
+
+    if shape == SHAPE_LIST:
+        return lambda v: v if v is None else [convert_one(item) for item in v]
+    return convert_one
+
+
+def get_converter(model: Type[BaseModel], field: ModelField) -> Union[Converter, None]:
+    """Converter that turns a database value into what validation would have
+    produced, None when the value can be used as is."""
+    kind = field.type_
+    if not isinstance(kind, type) or field.shape not in (SHAPE_SINGLETON, SHAPE_LIST):
+        return None
+
+    if issubclass(kind, BaseModel):
+        return _nested_converter(kind, field.shape)
+
+    if field.shape != SHAPE_SINGLETON:
+        return None
+    if issubclass(kind, Timestamp):
+        return timestamp_converter
+    if issubclass(kind, StringUUID):
+        return string_uuid_converter
+    if issubclass(kind, NativeUUID):
+        return native_uuid_converter
+    if issubclass(kind, Enum) and model.__config__.use_enum_values:
+        return enum_value_converter
+    return None
+
+
+def compile_trusted_builder(model: Type[ModelType]) -> Callable[[Any], ModelType]:
+    """Build a function that creates `model` instances from ORM objects, rows
+    or mappings without validation.
+
+    Field lookups, converters and defaults are resolved once here, so
+    building an instance is a loop over precomputed extractors followed by
+    the same `__dict__` assignment `BaseModel.construct` does.
+    """
+    extractors: List[Tuple[str, Union[Converter, None], ModelField]] = [
+        (name, get_converter(model, field), field) for name, field in model.__fields__.items()
+    ]
+    has_private_attributes = bool(model.__private_attributes__)
+    new = model.__new__
+
+    def build(source: Any) -> ModelType:
+        if isinstance(source, Row):
+            source = source._asdict()
+        get = source.get if isinstance(source, Mapping) else lambda key, default: getattr(source, key, default)
+
+        values: Dict[str, Any] = {}
+        fields_set = set()
+        for name, converter, field in extractors:
+            value = get(name, MISSING)
+            if value is MISSING:
+                values[name] = field.get_default()
+                continue
+            values[name] = converter(value) if converter is not None and value is not None else value
+            fields_set.add(name)
+
+        instance = new(model)
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__fields_set__", fields_set)
+        if has_private_attributes:
+            instance._init_private_attributes()
+        return instance
+
+    return build
+
+
+def get_trusted_builder(model: Type[ModelType]) -> Callable[[Any], ModelType]:
+    builder = _builders.get(model)
+    if builder is None:
+        builder = _builders[model] = compile_trusted_builder(model)
+    return builder
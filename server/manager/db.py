@@ -1,7 +1,220 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base
+import asyncio
+import itertools
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncGenerator, List, Sequence, Union
+
+from sqlalchemy import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from server.config.factory import settings
+from server.manager.profiler import install_query_profiler
+
+ASYNC_DRIVER = "postgresql+asyncpg"
+# epoch until which the client's reads go to the primary, set after it wrote
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
 
 Base = declarative_base()
-engine = create_engine(url=settings.RDS_URL)
+
+
+def to_async_url(url: str) -> str:
+    """Rewrite a PostgreSQL DSN so that it uses the asyncpg driver."""
+    scheme, separator, rest = str(url).partition("://")
+    if not separator:
+        raise ValueError(f"Invalid database url: {url!r}")
+    return f"{ASYNC_DRIVER}://{rest}"
+
+
+def get_async_engine(url: Union[str, None] = None) -> AsyncEngine:
+    engine = create_async_engine(
+        url=to_async_url(url or settings.RDS_URL),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if settings.QUERY_PROFILER:
+        install_query_profiler(engine)
+    return engine
+
+
+_read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+@lru_cache()
+def get_engine() -> AsyncEngine:
+    """Engine of the primary shared by the application, created (and the
+    asyncpg dialect imported) on first use."""
+    return get_async_engine()
+
+
+class ReplicaRouter:
+    """Round-robin over the replica engines.
+
+    A replica that can't be connected to is ejected for `eject_seconds`
+    and then tried again; without a healthy replica reads go to the
+    primary.
+    """
+
+    def __init__(self, primary: AsyncEngine, replicas: Sequence[AsyncEngine], *, eject_seconds: float):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.eject_seconds = eject_seconds
+        self._ejected_until: List[float] = [0.0] * len(self.replicas)
+        self._counter = itertools.count()
+
+    def get_read_engine(self) -> AsyncEngine:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            index = next(self._counter) % len(self.replicas)
+            if self._ejected_until[index] <= now:
+                return self.replicas[index]
+        return self.primary
+
+    def eject(self, engine: AsyncEngine) -> None:
+        self._ejected_until[self.replicas.index(engine)] = time.monotonic() + self.eject_seconds
+
+    def healthy(self) -> List[bool]:
+        now = time.monotonic()
+        return [until <= now for until in self._ejected_until]
+
+
+@lru_cache()
+def get_replica_router() -> ReplicaRouter:
+    return ReplicaRouter(
+        get_engine(),
+        [get_async_engine(url) for url in settings.RDS_REPLICA_URLS],
+        eject_seconds=settings.DB_REPLICA_EJECT_SECONDS,
+    )
+
+
+def get_read_engine() -> AsyncEngine:
+    """Engine for read-only work, a replica unless the client wrote within
+    the read-your-writes window."""
+    if _read_from_primary.get():
+        return get_engine()
+    return get_replica_router().get_read_engine()
+
+
+def connect_read_engine() -> Connection:
+    """Connection of `get_read_engine`, a replica that can't be connected to
+    is ejected and the next one tried."""
+    router = get_replica_router()
+    while True:
+        engine = get_read_engine()
+        try:
+            return engine.sync_engine.connect()
+        except (DBAPIError, OSError, asyncio.TimeoutError):
+            if engine is router.primary:
+                raise
+            router.eject(engine)
+
+
+class ReadSession(Session):
+    """Session for read-only work that picks its engine when the first
+    statement needs a connection rather than when it is created."""
+
+    _read_connection: Union[Connection, None] = None
+
+    def get_bind(self, mapper: Any = None, **kw: Any) -> Union[Engine, Connection]:
+        if self._read_connection is None:
+            self._read_connection = connect_read_engine()
+        return self._read_connection
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            # the session doesn't close a connection it was bound to
+            if self._read_connection is not None:
+                self._read_connection.close()
+                self._read_connection = None
+
+
+@lru_cache()
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=get_engine(), expire_on_commit=False)
+
+
+@lru_cache()
+def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(sync_session_class=ReadSession, expire_on_commit=False)
+
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that yields a session scoped to one request.
+
+    Routes commit explicitly before they return: code after the `yield`
+    only runs once the response is sent, too late for a failed commit to
+    change it. Whatever wasn't committed is rolled back when the request
+    raises or the session is closed.
+    """
+    async with get_session_factory()() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that yields a session for read-only routes.
+
+    The session is bound to a replica (see `ReadSession`) once its first
+    statement runs, so a request rejected before it queries never takes a
+    connection. Nothing is committed.
+    """
+    async with get_read_session_factory()() as session:
+        yield session
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client's reads on the primary for `DB_READ_YOUR_WRITES_SECONDS`
+    after it wrote, so replica lag doesn't hide its own changes.
+
+    Any successful request with an unsafe method counts as a write, there
+    is no telling from the statements before the response starts. The window is carried by a cookie, so it holds
+    across workers and instances.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.RDS_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        sticky = False
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                until = cookie_parser(value.decode("latin-1")).get(READ_YOUR_WRITES_COOKIE, "")
+                sticky = until.isdigit() and int(until) > time.time()
+                break
+        writes = scope["method"] not in SAFE_METHODS
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes and message["status"] < 400:
+                window = int(settings.DB_READ_YOUR_WRITES_SECONDS)
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    (
+                        f"{READ_YOUR_WRITES_COOKIE}={int(time.time()) + window}; Max-Age={window}; Path=/; HttpOnly;"
+                        " SameSite=Lax"
+                    ),
+                )
+            await send(message)
+
+        token = _read_from_primary.set(sticky)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _read_from_primary.reset(token)
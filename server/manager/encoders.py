@@ -0,0 +1,175 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from functools import partial
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Sequence, Tuple, Type, Union
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_FROZENSET, SHAPE_LIST, SHAPE_SET, SHAPE_SINGLETON, SHAPE_TUPLE_ELLIPSIS, ModelField
+
+from server.manager.types import NativeUUID
+from server.manager.utils import proxy_func
+
+Converter = Callable[[Any], Any]
+
+# values of these types are handed to the database driver as they are
+PASSTHROUGH_TYPES: FrozenSet[type] = frozenset({str, int, float, bool, bytes, datetime, date, time, timedelta, Decimal})
+SEQUENCE_SHAPES: FrozenSet[int] = frozenset({SHAPE_LIST, SHAPE_SET, SHAPE_FROZENSET, SHAPE_TUPLE_ELLIPSIS})
+
+_encoders: Dict[Tuple[Type[BaseModel], bool], "DBEncoder"] = {}
+
+encodings_dict: Dict[Any, Callable[[Any], Any]] = {
+    datetime: proxy_func,  # don't transform datetime objects
+    date: proxy_func,  # don't transform date objects
+}
+
+jsonable_db_encoder = partial(
+    jsonable_encoder,
+    exclude_unset=True,
+    by_alias=False,
+    custom_encoder=encodings_dict,  # override `jsonable_encoder` default behaviour
+)
+
+
+def encode_value(v: Any) -> Any:
+    """Encode a value of a type only known at runtime."""
+    if v is None or type(v) in PASSTHROUGH_TYPES:
+        return v
+    if isinstance(v, BaseModel):
+        return get_db_encoder(type(v)).encode(v)
+    if isinstance(v, Enum):
+        return v.value
+    if isinstance(v, UUID):
+        return str(v)
+    if isinstance(v, dict):
+        return {key: encode_value(value) for key, value in v.items()}
+    if isinstance(v, (list, tuple, set, frozenset)):
+        return [encode_value(item) for item in v]
+    return jsonable_db_encoder(v)
+
+
+def enum_value(v: Any) -> Any:
+    return v.value if isinstance(v, Enum) else v
+
+
+def uuid_string(v: Any) -> Any:
+    return str(v) if isinstance(v, UUID) else v
+
+
+def _item_converter(kind: Any) -> Union[Converter, None]:
+    """Converter for a single value of a statically known type, None when
+    the value needs no conversion."""
+    if not isinstance(kind, type):
+        return encode_value
+    if issubclass(kind, BaseModel):
+        return lambda v: get_db_encoder(kind).encode(v)
+    if issubclass(kind, Enum):
+        return enum_value
+    if issubclass(kind, NativeUUID):
+        # bound as is, asyncpg sends uuid.UUID to `uuid` columns in binary
+        return None
+    if issubclass(kind, UUID):
+        return uuid_string
+    if any(issubclass(kind, passthrough) for passthrough in PASSTHROUGH_TYPES):
+        return None
+    return encode_value
+
+
+def get_field_converter(field: ModelField) -> Union[Converter, None]:
+    if field.shape == SHAPE_SINGLETON:
+        return _item_converter(field.type_)
+    if field.shape in SEQUENCE_SHAPES:
+        item_converter = _item_converter(field.type_)
+        if item_converter is None:
+            return list
+        return lambda v: [item_converter(item) if item is not None else None for item in v]
+    return encode_value
+
+
+class DBEncoder:
+    """Encoder compiled once per schema class that turns instances into
+    insert-ready dicts or tuples.
+
+    Field types are inspected at compile time, so encoding a value is a
+    direct converter call (or nothing at all for str, numbers, datetimes
+    and other driver native types) instead of `jsonable_encoder`'s
+    recursive isinstance chain. Output matches `jsonable_db_encoder` except
+    that Decimal, time, timedelta and bytes values are kept as they are
+    (see `PASSTHROUGH_TYPES`), the driver binds them natively where
+    `jsonable_encoder` turns them into numbers and strings.
+    """
+
+    def __init__(self, model: Type[BaseModel], *, by_alias: bool = False):
+        self.model = model
+        self.by_alias = by_alias
+        self.fields: Tuple[str, ...] = tuple(model.__fields__)
+        self.keys: Dict[str, str] = {
+            name: field.alias if by_alias else name for name, field in model.__fields__.items()
+        }
+        self.converters: Dict[str, Union[Converter, None]] = {
+            name: get_field_converter(field) for name, field in model.__fields__.items()
+        }
+
+    def encode(self, instance: BaseModel, *, exclude_unset: bool = True) -> Dict[str, Any]:
+        values = instance.__dict__
+        converters, keys = self.converters, self.keys
+        fields_set = instance.__fields_set__
+        result = {}
+        for name in self.fields:
+            if exclude_unset and name not in fields_set:
+                continue
+            value = values[name]
+            converter = converters[name]
+            result[keys[name]] = converter(value) if converter is not None and value is not None else value
+        return result
+
+    def encode_many(self, instances: Iterable[BaseModel], *, exclude_unset: bool = True) -> List[Dict[str, Any]]:
+        encode = self.encode
+        return [encode(instance, exclude_unset=exclude_unset) for instance in instances]
+
+    def encode_tuples(
+        self,
+        instances: Iterable[BaseModel],
+        *,
+        columns: Union[Sequence[str], None] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """Encode instances as tuples in `columns` order (all fields by
+        default), e.g. for `COPY` or `executemany`. Unset fields hold their
+        defaults so that every tuple has the same shape."""
+        columns = tuple(columns or self.fields)
+        extractors = [(name, self.converters[name]) for name in columns]
+        rows = []
+        for instance in instances:
+            values = instance.__dict__
+            rows.append(
+                tuple(
+                    converter(values[name]) if converter is not None and values[name] is not None else values[name]
+                    for name, converter in extractors
+                )
+            )
+        return rows
+
+
+def get_db_encoder(model: Type[BaseModel], *, by_alias: bool = False) -> DBEncoder:
+    encoder = _encoders.get((model, by_alias))
+    if encoder is None:
+        encoder = _encoders[(model, by_alias)] = DBEncoder(model, by_alias=by_alias)
+    return encoder
+
+
+def to_db_encoder(obj: Any) -> Any:
+    """Encode a model (or any value) for the database, keeping only the
+    fields that were set."""
+    if isinstance(obj, BaseModel):
+        return get_db_encoder(type(obj)).encode(obj)
+    return encode_value(obj)
+
+
+def encode_many(instances: Sequence[BaseModel], *, exclude_unset: bool = True) -> List[Dict[str, Any]]:
+    """Batch counterpart of `to_db_encoder` for a list of same class
+    models."""
+    if not instances:
+        return []
+    return get_db_encoder(type(instances[0])).encode_many(instances, exclude_unset=exclude_unset)
@@ -54,3 +54,61 @@ class RatePeriod(str, Enum):
     HOUR = "hours"
     DAY = "days"
     WEEK = "weeks"
+
+
+class RateLimitAlgorithm(str, Enum):
+    """Algorithms supported by RateLimiter."""
+
+    TOKEN_BUCKET = "token_bucket"
+    SLIDING_WINDOW_LOG = "sliding_window_log"
+
+
+class RateLimitBackendType(str, Enum):
+    """Storages for RateLimiter state."""
+
+    MEMORY = "memory"
+    DATABASE = "database"
+
+
+class HashingPoolType(str, Enum):
+    """Executors that password hashing can be offloaded to."""
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+class TaskStatus(str, Enum):
+    """Lifecycle states of a task."""
+
+    TODO = "todo"
+    IN_PROGRESS = "in_progress"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+
+class TaskEvent(str, Enum):
+    """Events the task scheduler fires at a time relative to the due date."""
+
+    REMINDER = "reminder"
+    OVERDUE = "overdue"
+
+
+class ImportFormat(str, Enum):
+    """Record formats accepted by bulk imports."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ExportFormat(str, Enum):
+    """Record formats produced by streaming exports."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class CountMode(str, Enum):
+    """Ways the total of a paginated query is counted."""
+
+    EXACT = "exact"
+    ESTIMATE = "estimate"
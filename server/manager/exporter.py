@@ -0,0 +1,92 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Sequence, Type, Union
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from server.manager.db import get_session_factory
+from server.manager.enums import ExportFormat
+from server.manager.responses import ORJSON_OPTIONS, orjson_default
+from server.manager.utils import KeyTransformer, camel_case_transformer, get_schema_transformer, get_timestamp
+
+NDJSON_OPTIONS = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+# gzip container (header and trailer) instead of a raw zlib stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+EXPORT_MEDIA_TYPES: Dict[ExportFormat, str] = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def render_ndjson(rows: List[Dict[str, Any]]) -> bytes:
+    dumps = orjson.dumps
+    return b"".join(dumps(row, default=orjson_default, option=NDJSON_OPTIONS) for row in rows)
+
+
+def to_csv_value(v: Any) -> Any:
+    """Cell value in the same representation as the JSON output."""
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return get_timestamp(v)
+    if isinstance(v, (dict, list)):
+        return orjson.dumps(v, default=orjson_default, option=ORJSON_OPTIONS).decode(encoding="utf-8")
+    return v
+
+
+def render_csv(rows: Sequence[Sequence[Any]], *, header: Union[Sequence[str], None] = None) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows([to_csv_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode(encoding="utf-8")
+
+
+async def stream_rows(
+    statement: Select,
+    *,
+    params: Union[Dict[str, Any], None] = None,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    schema: Union[Type[BaseModel], None] = None,
+    yield_per: int = 1_000,
+    session_factory: Union[async_sessionmaker[AsyncSession], None] = None,
+) -> AsyncIterator[bytes]:
+    """Run `statement` on a server-side cursor and yield it rendered as
+    NDJSON or CSV, one chunk per `yield_per` rows.
+
+    The session is opened by the generator itself so that it lives as long
+    as the response is being sent, keys follow the `schema` aliases (camel
+    case otherwise) like the JSON endpoints.
+    """
+    transformer: KeyTransformer = camel_case_transformer if schema is None else get_schema_transformer(schema)
+    factory = session_factory or get_session_factory()
+    async with factory() as session:
+        result = await session.stream(statement.execution_options(yield_per=yield_per), params)
+        header_sent = False
+        async for partition in result.partitions():
+            if export_format == ExportFormat.CSV:
+                header = None
+                if not header_sent:
+                    header, header_sent = [transformer.key(key) for key in partition[0]._fields], True
+                yield render_csv(partition, header=header)
+            else:
+                yield render_ndjson(transformer(partition))
+
+        if export_format == ExportFormat.CSV and not header_sent:
+            yield render_csv([], header=[transformer.key(key) for key in result.keys()])
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes], *, level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a byte stream on the fly, every chunk is flushed so that
+    the client can decode rows as they arrive."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
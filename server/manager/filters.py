@@ -0,0 +1,266 @@
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Mapping, Optional, Tuple, Union
+from uuid import UUID
+
+from fastapi import Request
+from pydantic.datetime_parse import parse_date, parse_datetime
+from sqlalchemy import Column, PrimaryKeyConstraint, Select, UniqueConstraint, and_, bindparam, true
+from sqlalchemy.sql.elements import ColumnElement
+
+from server.config.factory import settings
+from server.manager.enums import FilterOps
+from server.manager.exceptions import ServerException
+from server.manager.types import Timestamp
+
+FILTER_SEPARATOR = "__"
+LIST_SEPARATOR = ","
+LIKE_ESCAPE = "\\"
+DEFAULT_RESERVED_PARAMS: FrozenSet[str] = frozenset({"cursor", "limit", "offset", "order_by", "page", "total"})
+
+# every spelling of an operator that is accepted after the `__` separator: member names (aliases included)
+# in lower case, e.g. `status__not_in` or `due__le`, and the raw enum values that are valid identifiers
+OPERATOR_LOOKUP: Dict[str, FilterOps] = {
+    **{op.value: op for op in FilterOps if op.value.isidentifier()},
+    **{name.lower(): op for name, op in FilterOps.__members__.items()},
+}
+LIST_OPERATORS: FrozenSet[FilterOps] = frozenset({FilterOps.IN, FilterOps.NOT_IN})
+NULL_OPERATORS: FrozenSet[FilterOps] = frozenset({FilterOps.ISNULL, FilterOps.NOT_NULL})
+TRUE_VALUES: FrozenSet[str] = frozenset({"1", "true", "t", "yes", "y", "on"})
+FALSE_VALUES: FrozenSet[str] = frozenset({"0", "false", "f", "no", "n", "off"})
+
+Signature = Tuple[Tuple[str, FilterOps, Optional[bool]], ...]
+
+# condition of every operator taking a value, from the column and the bound parameter
+CONDITION_BUILDERS: Dict[FilterOps, Callable[[Any, Any], ColumnElement]] = {
+    FilterOps.EQUAL: lambda column, param: column == param,
+    FilterOps.NOT_EQUAL: lambda column, param: column != param,
+    FilterOps.GREATER: lambda column, param: column > param,
+    FilterOps.GREATER_OR_EQUAL: lambda column, param: column >= param,
+    FilterOps.LESS: lambda column, param: column < param,
+    FilterOps.LESS_OR_EQUAL: lambda column, param: column <= param,
+    FilterOps.IN: lambda column, param: column.in_(param),
+    FilterOps.NOT_IN: lambda column, param: column.not_in(param),
+    FilterOps.LIKE: lambda column, param: column.like(param),
+    FilterOps.ILIKE: lambda column, param: column.ilike(param),
+    FilterOps.STARTSWITH: lambda column, param: column.like(param, escape=LIKE_ESCAPE),
+    FilterOps.ENDSWITH: lambda column, param: column.like(param, escape=LIKE_ESCAPE),
+}
+
+
+def parse_bool(v: str) -> bool:
+    value = v.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError("Invalid boolean")
+
+
+def parse_aware_datetime(v: str) -> datetime:
+    """Parse ISO-8601 strings or unix timestamps (seconds or milliseconds) into
+    UTC aware datetime."""
+    return Timestamp.ensure_has_timezone(parse_datetime(v))
+
+
+def escape_like(v: str) -> str:
+    """Escape LIKE wildcards so that user input is matched literally."""
+    return v.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+VALUE_PARSERS: Dict[type, Callable[[str], Any]] = {
+    bool: parse_bool,
+    int: int,
+    float: float,
+    Decimal: Decimal,
+    UUID: UUID,
+    datetime: parse_aware_datetime,
+    date: parse_date,
+}
+
+
+def resolve_column(expression: Any) -> Any:
+    """Get the underlying Column from an ORM attribute (or return the
+    expression as is)."""
+    prop = getattr(expression, "property", None)
+    columns = getattr(prop, "columns", None)
+    if columns:
+        return columns[0]
+    return expression
+
+
+def is_indexed(column: Any) -> bool:
+    """Whether the column is the leading column of any index or key of its
+    table, i.e. whether a filter on it can avoid a sequential scan."""
+    if not isinstance(column, Column):
+        return False
+    if column.primary_key or column.index or column.unique:
+        return True
+
+    table = column.table
+    leading_columns = [next(iter(index.columns), None) for index in table.indexes]
+    # foreign keys get no index of their own in PostgreSQL
+    leading_columns += [
+        next(iter(constraint.columns), None)
+        for constraint in table.constraints
+        if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)) and constraint.columns
+    ]
+    return any(leading is column for leading in leading_columns)
+
+
+def get_value_parser(column: Any) -> Callable[[str], Any]:
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return str
+
+    for kind, parser in VALUE_PARSERS.items():
+        if issubclass(python_type, kind):
+            return parser
+    return str
+
+
+class FilterField:
+    """Whitelisted column that query string filters may target."""
+
+    def __init__(self, expression: Any, *, parser: Union[Callable[[str], Any], None] = None):
+        self.expression = expression
+        self.column = resolve_column(expression)
+        self.parser = parser or get_value_parser(self.column)
+        self.indexed = is_indexed(self.column)
+
+
+class FilterQuery:
+    """Parsed filters, ready to be applied to a select statement.
+
+    `clause` only contains bind parameters, the actual values are in
+    `params` and have to be passed on execution.
+    """
+
+    def __init__(self, *, filter_set: "FilterSet", signature: Signature, params: Dict[str, Any]):
+        self.filter_set = filter_set
+        self.signature = signature
+        self.params = params
+
+    @property
+    def clause(self) -> ColumnElement:
+        return self.filter_set.build_clause(self.signature)
+
+    def apply(self, statement: Select) -> Select:
+        return self.filter_set.build_statement(statement, self.signature)
+
+    @property
+    def key(self) -> Hashable:
+        """Signature and values of the filters, e.g. to cache results by."""
+        values = tuple(
+            (name, tuple(value) if isinstance(value, list) else value) for name, value in sorted(self.params.items())
+        )
+        return self.signature, values
+
+
+class FilterSet:
+    """Query string filter engine over a whitelisted column map.
+
+    Filters are written as `<field>__<operator>=<value>` (`<field>=<value>`
+    means equality), list operators take comma separated values. Clauses are
+    built with bind parameters only, so the statement shape is cached per
+    filter signature and SQLAlchemy's compiled cache is reused no matter
+    what values come in.
+
+    Examples:
+        >>> task_filters = FilterSet({"status": Task.status, "due": Task.due_at})
+        >>> query = task_filters.parse([("status__in", "todo,done"), ("due__le", "1700000000000")])
+        >>> await session.execute(query.apply(select(Task)), query.params)
+    """
+
+    def __init__(
+        self,
+        fields: Mapping[str, Any],
+        *,
+        reserved: Iterable[str] = DEFAULT_RESERVED_PARAMS,
+        require_index: Union[bool, None] = None,
+        cache_size: int = 256,
+    ):
+        self.fields: Dict[str, FilterField] = {
+            name: field if isinstance(field, FilterField) else FilterField(field) for name, field in fields.items()
+        }
+        self.reserved: FrozenSet[str] = frozenset(reserved)
+        self._require_index = require_index
+        self.build_clause = lru_cache(maxsize=cache_size)(self._build_clause)
+
+    @property
+    def require_index(self) -> bool:
+        """Whether only indexed fields may be filtered, by default in
+        production only."""
+        return settings.MODE == "production" if self._require_index is None else self._require_index
+
+    def __call__(self, request: Request) -> FilterQuery:
+        """Use the filter set as FastAPI dependency."""
+        return self.parse(request.query_params.multi_items())
+
+    def parse(self, items: Iterable[Tuple[str, str]]) -> FilterQuery:
+        conditions: List[Tuple[str, FilterOps, Optional[bool], Any]] = []
+        for key, raw_value in items:
+            if key in self.reserved:
+                continue
+
+            name, _, operator = key.partition(FILTER_SEPARATOR)
+            field = self.fields.get(name)
+            if field is None:
+                raise ServerException(message=f"Filtering by '{name}' is not supported.")
+
+            op = OPERATOR_LOOKUP.get(operator.lower()) if operator else FilterOps.EQUAL
+            if op is None:
+                raise ServerException(message=f"Unknown filter operator '{operator}'.")
+
+            if self.require_index and not field.indexed:
+                raise ServerException(message=f"Filtering by '{name}' is not allowed.")
+
+            conditions.append((name, op, *self._parse_value(name, field, op, raw_value)))
+
+        conditions.sort(key=lambda condition: (condition[0], condition[1].value))
+        signature: Signature = tuple((name, op, flag) for name, op, flag, _ in conditions)
+        params = {self._param_name(index): value for index, (*_, value) in enumerate(conditions) if value is not None}
+        return FilterQuery(filter_set=self, signature=signature, params=params)
+
+    def _parse_value(self, name: str, field: FilterField, op: FilterOps, raw_value: str) -> Tuple[Optional[bool], Any]:
+        try:
+            if op in NULL_OPERATORS:
+                return parse_bool(raw_value), None
+            if op in LIST_OPERATORS:
+                return None, [field.parser(item) for item in raw_value.split(LIST_SEPARATOR) if item]
+            if op == FilterOps.STARTSWITH:
+                return None, escape_like(raw_value) + "%"
+            if op == FilterOps.ENDSWITH:
+                return None, "%" + escape_like(raw_value)
+            if op in (FilterOps.LIKE, FilterOps.ILIKE):
+                return None, raw_value
+            return None, field.parser(raw_value)
+        except (TypeError, ValueError, ArithmeticError) as error:
+            raise ServerException(message=f"Invalid value for '{name}' filter.") from error
+
+    @staticmethod
+    def _param_name(index: int) -> str:
+        return f"filter_{index}"
+
+    def _build_condition(self, index: int, name: str, op: FilterOps, flag: Optional[bool]) -> ColumnElement:
+        column = self.fields[name].expression
+        if op in NULL_OPERATORS:
+            return column.is_(None) if flag == (op == FilterOps.ISNULL) else column.is_not(None)
+
+        param = bindparam(self._param_name(index), expanding=op in LIST_OPERATORS)
+        return CONDITION_BUILDERS[op](column, param)
+
+    def _build_clause(self, signature: Signature) -> ColumnElement:
+        if not signature:
+            return true()
+        return and_(*(self._build_condition(index, *condition) for index, condition in enumerate(signature)))
+
+    def build_statement(self, statement: Select, signature: Signature) -> Select:
+        """Filter `statement`, only the clause is cached (by signature): the
+        compiled cache of SQLAlchemy keys on the statement's structure, so
+        statements built per request reuse the compiled SQL all the same."""
+        if not signature:
+            return statement
+        return statement.where(self.build_clause(signature))
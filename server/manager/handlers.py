@@ -1,3 +1,5 @@
+from typing import Any, Dict, Iterable, List, Sequence
+
 from fastapi import Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import ORJSONResponse
@@ -6,6 +8,7 @@ from sqlalchemy.exc import IntegrityError, NoResultFound
 from server.config.factory import settings
 from server.manager.enums import ClientEndStatus
 from server.manager.exceptions import RateLimitException, ServerException
+from server.manager.metrics import get_metrics
 
 
 def server_exception_handler(request: Request, exc: ServerException) -> ORJSONResponse:
@@ -18,9 +21,31 @@ def server_exception_handler(request: Request, exc: ServerException) -> ORJSONRe
     Returns:
         result (ORJSONResponse): Transformed JSON response from backend exception.
     """
+    get_metrics().count_exception("server_exception")
     return ORJSONResponse(content=exc.dict(), status_code=exc.code)
 
 
+def format_validation_errors(errors: Iterable[Dict[str, Any]], *, location: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """Convert pydantic errors to the UnprocessableEntityOutSchema shape.
+
+    Args:
+        errors (Iterable[dict]): Errors as returned by `ValidationError.errors()`.
+        location (Sequence[str]): Prefix for the location of every error (e.g. row of a bulk import).
+
+    Returns:
+        result (list): Error details.
+    """
+    return [
+        {
+            "location": [*location, *error["loc"]],
+            "message": error["msg"].capitalize() + ".",
+            "type": error["type"],
+            "context": error.get("ctx", None),
+        }
+        for error in errors
+    ]
+
+
 def validation_exception_handler(request: Request, exc: RequestValidationError) -> ORJSONResponse:
     """Handler for RequestValidationError. Get the original 'detail' list of
     errors wrapped with client end structure.
@@ -32,18 +57,8 @@ def validation_exception_handler(request: Request, exc: RequestValidationError)
     Returns:
         result (ORJSONResponse): Transformed JSON response from backend exception.
     """
-    errors = exc.errors()
-    details = []
-    for error in errors:
-        details.append(
-            {
-                "location": error["loc"],
-                "message": error["msg"].capitalize() + ".",
-                "type": error["type"],
-                "context": error.get("ctx", None),
-            },
-        )
-
+    get_metrics().count_exception("validation_error")
+    details = format_validation_errors(exc.errors())
     return ORJSONResponse(
         content={
             "status": ClientEndStatus.FAIL,
@@ -102,4 +117,5 @@ def rate_limit_exception_handler(request: Request, exc: RateLimitException) -> O
     Returns:
         result (ORJSONResponse): Transformed JSON response from backend exception.
     """
+    get_metrics().count_exception("rate_limit_exception")
     return ORJSONResponse(content=exc.dict(), status_code=exc.code, headers=exc.headers)
@@ -0,0 +1,342 @@
+import csv
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Sequence, Tuple, Type, Union
+
+import orjson
+from fastapi import status
+from pydantic import ValidationError
+from sqlalchemy import Boolean, Table, column, func, literal_column, not_, select, table, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from server.config.factory import settings
+from server.manager.db import get_engine
+from server.manager.encoders import get_db_encoder
+from server.manager.enums import ImportFormat
+from server.manager.exceptions import ServerException
+from server.manager.handlers import format_validation_errors
+from server.manager.schemas import BaseInSchema, ImportReportOutSchema
+from server.manager.utils import get_alias_map
+
+# a record that doesn't fit in this many bytes is rejected, it keeps a missing newline from buffering the whole input
+MAX_RECORD_BYTES = 1024 * 1024
+FILE_CHUNK_BYTES = 64 * 1024
+
+CONTENT_TYPE_FORMATS: Dict[str, ImportFormat] = {
+    "application/x-ndjson": ImportFormat.NDJSON,
+    "application/ndjson": ImportFormat.NDJSON,
+    "application/jsonl": ImportFormat.NDJSON,
+    "application/json-lines": ImportFormat.NDJSON,
+    "text/csv": ImportFormat.CSV,
+    "application/csv": ImportFormat.CSV,
+}
+SUFFIX_FORMATS: Dict[str, ImportFormat] = {
+    ".ndjson": ImportFormat.NDJSON,
+    ".jsonl": ImportFormat.NDJSON,
+    ".csv": ImportFormat.CSV,
+}
+
+Record = Tuple[int, bytes]
+RecordParser = Callable[[bytes], Dict[str, Any]]
+
+
+def get_import_format(*, content_type: Union[str, None] = None, filename: Union[str, None] = None) -> ImportFormat:
+    """Guess the record format from a content type or file name."""
+    if content_type:
+        import_format = CONTENT_TYPE_FORMATS.get(content_type.partition(";")[0].strip().lower())
+        if import_format is not None:
+            return import_format
+    if filename:
+        import_format = SUFFIX_FORMATS.get(Path(filename).suffix.lower())
+        if import_format is not None:
+            return import_format
+    raise ServerException(
+        message="Unsupported import format, use NDJSON or CSV.",
+        code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+    )
+
+
+async def iter_file_chunks(path: Path, *, size: int = FILE_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := file.read(size):
+            yield chunk
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without the line terminators."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            if len(buffer) > MAX_RECORD_BYTES:
+                raise ServerException(
+                    message="Import record is too large.",
+                    code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if buffer:
+        yield buffer.rstrip(b"\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """Numbered NDJSON lines, blank lines are skipped but counted."""
+    number = 0
+    async for line in iter_lines(chunks):
+        number += 1
+        if line.strip():
+            yield number, line
+
+
+async def iter_csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """Numbered CSV records (header included as record 0).
+
+    Physical lines are joined while a quoted field is open, i.e. while the
+    record holds an odd number of quotes (escaped quotes come in pairs).
+    """
+    number, pending = -1, b""
+    async for line in iter_lines(chunks):
+        pending = pending + b"\n" + line if pending else line
+        if pending.count(b'"') % 2:
+            if len(pending) > MAX_RECORD_BYTES:
+                raise ServerException(
+                    message="Import record is too large.",
+                    code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            continue
+        if pending.strip():
+            number += 1
+            yield number, pending
+        pending = b""
+    if pending.strip():
+        yield number + 1, pending
+
+
+def parse_ndjson_record(record: bytes) -> Dict[str, Any]:
+    value = orjson.loads(record)
+    if not isinstance(value, dict):
+        raise ValueError("Expected a JSON object")
+    return value
+
+
+def get_csv_parser(header: bytes) -> RecordParser:
+    columns = [name.strip() for name in parse_csv_row(header)]
+
+    def parse_csv_record(record: bytes) -> Dict[str, Any]:
+        values = parse_csv_row(record)
+        if len(values) != len(columns):
+            raise ValueError(f"Expected {len(columns)} columns, got {len(values)}")
+        # empty cells are left out so that the schema defaults apply
+        return {name: value for name, value in zip(columns, values) if value != ""}
+
+    return parse_csv_record
+
+
+def parse_csv_row(record: bytes) -> List[str]:
+    return next(csv.reader([record.decode(encoding="utf-8-sig")], strict=True))
+
+
+class ImportReport:
+    """Counters and the first errors of a bulk import."""
+
+    def __init__(self, *, max_errors: int):
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+
+    def reject(self, details: List[Dict[str, Any]], *, count: int = 1) -> None:
+        self.rejected += count
+        room = self.max_errors - len(self.errors)
+        if len(details) > room:
+            self.errors_truncated = True
+        self.errors.extend(details[: max(room, 0)])
+
+    def dict(self) -> Dict[str, Any]:
+        """Converts ImportReport to the output of ImportReportOutSchema, keyed
+        by its field aliases."""
+        aliases = get_alias_map(ImportReportOutSchema)
+        fields = {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+        return {aliases[name]: value for name, value in fields.items()}
+
+
+class BulkImporter:
+    """Streaming NDJSON/CSV loader of one table.
+
+    Records are read in chunks of `chunk_size`, validated with `schema`
+    (invalid ones end up in the report in the UnprocessableEntityOutSchema
+    shape) and the valid ones are sent with asyncpg's binary COPY into a
+    temporary staging table, then merged into the table with one
+    `INSERT ... SELECT ... ON CONFLICT (conflict_column) DO UPDATE`. Every
+    chunk is its own transaction on a connection checked out for it, so
+    memory use only depends on the chunk size and the import is not
+    atomic: a chunk the database rejects (e.g. a reference to a missing
+    row) is counted as rejected and the other chunks are still imported.
+
+    Examples:
+        >>> importer = BulkImporter(table=Task.__table__, schema=TaskImportSchema, conflict_column="external_id")
+        >>> report = await importer.run(request.stream(), import_format=ImportFormat.NDJSON)
+    """
+
+    def __init__(
+        self,
+        *,
+        table: Table,
+        schema: Type[BaseInSchema],
+        conflict_column: str,
+        columns: Union[Sequence[str], None] = None,
+        chunk_size: int = 5_000,
+        max_errors: int = 1_000,
+        bind: Union[AsyncEngine, None] = None,
+    ):
+        self.table = table
+        self.schema = schema
+        self.conflict_column = conflict_column
+        self.columns: Tuple[str, ...] = tuple(columns or schema.__fields__)
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.bind = bind or get_engine()
+        self.encoder = get_db_encoder(schema)
+        self.staging_name = f"{table.name}_import"
+        self.create_staging_statement = text(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {self.staging_name} "
+            f"(LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        self.merge_statement = self._build_merge_statement()
+
+    def _build_merge_statement(self) -> Any:
+        staging = table(self.staging_name, *(column(name) for name in self.columns))
+        # client side defaults would be rendered as one value for all rows, server defaults fill the rest
+        statement = insert(self.table).from_select(self.columns, select(*staging.c), include_defaults=False)
+
+        update_columns = [name for name in self.columns if name != self.conflict_column]
+        changes = {name: statement.excluded[name] for name in update_columns}
+        if "updated_at" in self.table.c and "updated_at" not in changes:
+            changes["updated_at"] = func.now()
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.conflict_column],
+            set_=changes,
+            # rows that already hold the imported values are left alone (no dead tuples, no updated_at bump)
+            where=tuple_(*(self.table.c[name] for name in update_columns)).is_distinct_from(
+                tuple_(*(statement.excluded[name] for name in update_columns))
+            ),
+        )
+        # xmax is zero for freshly inserted rows and the locking transaction id for updated ones
+        merged = statement.returning(literal_column("xmax = 0", type_=Boolean).label("inserted")).cte("merged")
+        return select(
+            func.count().filter(merged.c.inserted),
+            func.count().filter(not_(merged.c.inserted)),
+        )
+
+    async def run(self, chunks: AsyncIterable[bytes], *, import_format: ImportFormat) -> ImportReport:
+        report = ImportReport(max_errors=self.max_errors)
+        if import_format == ImportFormat.CSV:
+            records, parser = iter_csv_records(chunks), None
+        else:
+            records, parser = iter_ndjson_records(chunks), parse_ndjson_record
+
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        async for number, record in records:
+            if parser is None:
+                parser = self._get_csv_parser(record)
+                continue
+
+            report.received += 1
+            try:
+                batch.append((number, parser(record)))
+            except (ValueError, csv.Error) as error:
+                report.reject(
+                    [
+                        {
+                            "location": ["body", str(number)],
+                            "message": f"{error}.",
+                            "type": "value_error.record",
+                            "context": None,
+                        },
+                    ],
+                )
+
+            if len(batch) >= self.chunk_size:
+                await self._load(batch, report)
+                batch = []
+
+        if batch:
+            await self._load(batch, report)
+        return report
+
+    @staticmethod
+    def _get_csv_parser(header: bytes) -> RecordParser:
+        try:
+            return get_csv_parser(header)
+        except (ValueError, csv.Error) as error:
+            raise ServerException(message="Invalid CSV header.") from error
+
+    def _validate(self, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport) -> List[BaseInSchema]:
+        # keyed by the conflict column, a key repeated within one chunk would hit the same row twice in the merge
+        valid: Dict[Any, BaseInSchema] = {}
+        for number, values in batch:
+            try:
+                instance = self.schema.parse_obj(values)
+            except ValidationError as error:
+                report.reject(format_validation_errors(error.errors(), location=("body", str(number))))
+                continue
+
+            key = getattr(instance, self.conflict_column)
+            key = key if key is not None else (number,)
+            if valid.pop(key, None) is not None:
+                report.duplicates += 1
+            valid[key] = instance
+        return list(valid.values())
+
+    async def _load(self, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport) -> None:
+        instances = self._validate(batch, report)
+        if not instances:
+            return
+
+        try:
+            # a connection per chunk, so a slow upload doesn't hold one of the pool between chunks
+            async with self.bind.connect() as connection, connection.begin():
+                # the first statement opens the transaction on the driver connection, COPY must run inside it
+                await connection.execute(self.create_staging_statement)
+                driver_connection = (await connection.get_raw_connection()).driver_connection
+                await driver_connection.copy_records_to_table(
+                    self.staging_name,
+                    records=self.encoder.encode_tuples(instances, columns=self.columns),
+                    columns=self.columns,
+                )
+                inserted, updated = (await connection.execute(self.merge_statement)).one()
+        except IntegrityError as error:
+            # e.g. a reference to a project that doesn't exist, only this chunk is rolled back
+            report.reject(
+                [
+                    {
+                        "location": ["body", f"{batch[0][0]}-{batch[-1][0]}"],
+                        "message": f"Records {batch[0][0]} to {batch[-1][0]} were rejected by the database.",
+                        "type": "integrity_error",
+                        "context": str(error.orig) if settings.DEBUG else None,
+                    },
+                ],
+                count=len(instances),
+            )
+            return
+
+        report.inserted += inserted
+        report.updated += updated
+        report.unchanged += len(instances) - inserted - updated
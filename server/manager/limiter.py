@@ -0,0 +1,376 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Union
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.config.factory import settings
+from server.manager.db import get_session_factory
+from server.manager.enums import RateLimitAlgorithm, RateLimitBackendType, RatePeriod
+from server.manager.exceptions import RateLimitException
+
+KeyFunc = Callable[[Request], str]
+
+# request state attribute the limiter leaves its headers in for RateLimitHeadersMiddleware
+RATE_LIMIT_HEADERS_STATE = "rate_limit_headers"
+
+
+class Rate:
+    """Number of requests allowed per period.
+
+    Examples:
+        >>> Rate(times=100, period=RatePeriod.MINUTE).seconds
+        60.0
+    """
+
+    def __init__(self, times: int, period: RatePeriod = RatePeriod.MINUTE, multiplier: int = 1):
+        if times < 1 or multiplier < 1:
+            raise ValueError("Rate must allow at least one request per period")
+        self.times = times
+        self.period = period
+        self.multiplier = multiplier
+        self.seconds: float = timedelta(**{period.value: multiplier}).total_seconds()
+        self.per_second: float = times / self.seconds
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(times={self.times}, period={self.period}, multiplier={self.multiplier})"
+
+
+class Decision(NamedTuple):
+    """Outcome of one rate limit check, times are in seconds."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+def token_bucket_decision(*, tokens: float, allowed: bool, rate: Rate, cost: int) -> Decision:
+    """Build a decision from the bucket level left after the check."""
+    refill = rate.per_second
+    return Decision(
+        allowed=allowed,
+        limit=rate.times,
+        remaining=max(0, int(tokens)),
+        reset_after=(rate.times - tokens) / refill,
+        retry_after=0.0 if allowed else (cost - tokens) / refill,
+    )
+
+
+def sliding_window_decision(
+    *, hits: int, oldest: float, newest: float, now: float, allowed: bool, rate: Rate
+) -> Decision:
+    """Build a decision from the window log after the check."""
+    return Decision(
+        allowed=allowed,
+        limit=rate.times,
+        remaining=max(0, rate.times - hits),
+        reset_after=max(0.0, newest + rate.seconds - now),
+        retry_after=0.0 if allowed else max(0.0, oldest + rate.seconds - now),
+    )
+
+
+class RateLimitBackend(ABC):
+    """Storage of rate limiter state."""
+
+    @abstractmethod
+    async def token_bucket(self, key: str, *, rate: Rate, cost: int = 1) -> Decision:
+        """Take `cost` tokens from the bucket of `key` if there are enough."""
+
+    @abstractmethod
+    async def sliding_window_log(self, key: str, *, rate: Rate) -> Decision:
+        """Log a hit for `key` if fewer than `rate.times` hits happened during
+        the last `rate.seconds`."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per process backend, every check is O(1).
+
+    Keys are spread over `shards` dicts. Expired state is dropped lazily
+    when its key is touched again, and each shard evicts its least recently
+    used key once it holds more than its share of `max_keys`, so memory is
+    bounded no matter how many distinct clients show up.
+    """
+
+    def __init__(self, *, shards: int = 64, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self._shards: List[Dict[str, Any]] = [{} for _ in range(max(1, shards))]
+        self._shard_size = max(1, max_keys // len(self._shards))
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def _shard(self, key: str) -> Dict[str, Any]:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _store(self, shard: Dict[str, Any], key: str, state: Any) -> None:
+        # re-inserting keeps the dict ordered from least to most recently used
+        shard.pop(key, None)
+        shard[key] = state
+        if len(shard) > self._shard_size:
+            del shard[next(iter(shard))]
+
+    def check_token_bucket(self, key: str, *, rate: Rate, cost: int = 1) -> Decision:
+        now = self._clock()
+        shard = self._shard(key)
+        state = shard.get(key)
+        if state is None:
+            tokens = float(rate.times)
+        else:
+            tokens = min(float(rate.times), state[0] + (now - state[1]) * rate.per_second)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._store(shard, key, (tokens, now))
+        return token_bucket_decision(tokens=tokens, allowed=allowed, rate=rate, cost=cost)
+
+    def check_sliding_window_log(self, key: str, *, rate: Rate) -> Decision:
+        now = self._clock()
+        shard = self._shard(key)
+        log: Union[Deque[float], None] = shard.get(key)
+        if log is None:
+            log = deque(maxlen=rate.times)
+
+        window_start = now - rate.seconds
+        while log and log[0] <= window_start:
+            log.popleft()
+
+        allowed = len(log) < rate.times
+        if allowed:
+            log.append(now)
+        self._store(shard, key, log)
+        return sliding_window_decision(
+            hits=len(log), oldest=log[0], newest=log[-1], now=now, allowed=allowed, rate=rate
+        )
+
+    async def token_bucket(self, key: str, *, rate: Rate, cost: int = 1) -> Decision:
+        return self.check_token_bucket(key, rate=rate, cost=cost)
+
+    async def sliding_window_log(self, key: str, *, rate: Rate) -> Decision:
+        return self.check_sliding_window_log(key, rate=rate)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.clear()
+
+
+class DatabaseBackend(RateLimitBackend):
+    """Backend shared by every worker through PostgreSQL.
+
+    The token bucket is a single atomic upsert. The sliding window log is
+    serialized per key with a transaction scoped advisory lock. Both use
+    the database clock so that workers on different hosts agree on time.
+    """
+
+    TOKEN_BUCKET_QUERY = text("""
+        INSERT INTO rate_limit_buckets AS bucket (key, tokens, allowed, updated_at)
+        SELECT
+            CAST(:key AS varchar),
+            CAST(:capacity AS double precision) - CAST(:cost AS double precision),
+            true,
+            CAST(extract(epoch FROM clock_timestamp()) AS double precision)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = LEAST(:capacity, bucket.tokens + (EXCLUDED.updated_at - bucket.updated_at) * :refill)
+                - CASE
+                    WHEN LEAST(:capacity, bucket.tokens + (EXCLUDED.updated_at - bucket.updated_at) * :refill) >= :cost
+                    THEN :cost ELSE 0
+                END,
+            allowed = LEAST(:capacity, bucket.tokens + (EXCLUDED.updated_at - bucket.updated_at) * :refill) >= :cost,
+            updated_at = EXCLUDED.updated_at
+        RETURNING tokens, allowed
+        """)
+    LOCK_QUERY = text("SELECT pg_advisory_xact_lock(hashtext(:key))")
+    SLIDING_WINDOW_QUERY = text("""
+        WITH clock AS (
+            SELECT CAST(extract(epoch FROM clock_timestamp()) AS double precision) AS now,
+                CAST(:window AS double precision) AS span
+        ), pruned AS (
+            DELETE FROM rate_limit_hits USING clock WHERE key = :key AND hit_at <= clock.now - clock.span
+        ), live AS (
+            SELECT count(*) AS hits, min(hit_at) AS oldest, max(hit_at) AS newest
+            FROM rate_limit_hits, clock
+            WHERE key = :key AND hit_at > clock.now - clock.span
+        ), inserted AS (
+            INSERT INTO rate_limit_hits (key, hit_at)
+            SELECT :key, clock.now FROM clock, live WHERE live.hits < CAST(:limit AS bigint)
+            RETURNING hit_at
+        )
+        SELECT live.hits, live.oldest, live.newest, clock.now, (SELECT count(*) FROM inserted) > 0 AS allowed
+        FROM live, clock
+        """)
+    PRUNE_BUCKETS_QUERY = text(
+        "DELETE FROM rate_limit_buckets WHERE updated_at < extract(epoch FROM now()) - CAST(:max_age AS double"
+        " precision)"
+    )
+    PRUNE_HITS_QUERY = text(
+        "DELETE FROM rate_limit_hits WHERE hit_at < extract(epoch FROM now()) - CAST(:max_age AS double precision)"
+    )
+
+    def __init__(self, session_factory: Union[async_sessionmaker[AsyncSession], None] = None):
+        self._session_factory = session_factory or get_session_factory()
+
+    async def token_bucket(self, key: str, *, rate: Rate, cost: int = 1) -> Decision:
+        params = {"key": key, "capacity": float(rate.times), "refill": rate.per_second, "cost": float(cost)}
+        async with self._session_factory.begin() as session:
+            tokens, allowed = (await session.execute(self.TOKEN_BUCKET_QUERY, params)).one()
+        return token_bucket_decision(tokens=tokens, allowed=allowed, rate=rate, cost=cost)
+
+    async def sliding_window_log(self, key: str, *, rate: Rate) -> Decision:
+        async with self._session_factory.begin() as session:
+            await session.execute(self.LOCK_QUERY, {"key": key})
+            result = await session.execute(
+                self.SLIDING_WINDOW_QUERY, {"key": key, "window": rate.seconds, "limit": rate.times}
+            )
+            hits, oldest, newest, now, allowed = result.one()
+
+        if allowed:
+            hits, newest = hits + 1, now
+            oldest = now if oldest is None else oldest
+        return sliding_window_decision(hits=hits, oldest=oldest, newest=newest, now=now, allowed=allowed, rate=rate)
+
+    async def prune(self, *, max_age: float = timedelta(days=1).total_seconds()) -> None:
+        """Delete state that has been idle for longer than `max_age`
+        seconds."""
+        async with self._session_factory.begin() as session:
+            await session.execute(self.PRUNE_BUCKETS_QUERY, {"max_age": max_age})
+            await session.execute(self.PRUNE_HITS_QUERY, {"max_age": max_age})
+
+
+@lru_cache()
+def get_rate_limit_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == RateLimitBackendType.DATABASE:
+        return DatabaseBackend()
+    return MemoryBackend(shards=settings.RATE_LIMIT_SHARDS, max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+def key_by_ip(request: Request) -> str:
+    return request.client.host if request.client else "anonymous"
+
+
+def key_by_user(request: Request) -> str:
+    """Key by authenticated user id (`request.state.user_id`), falling back to
+    the client IP for anonymous requests."""
+    user_id = getattr(request.state, "user_id", None)
+    return f"user:{user_id}" if user_id is not None else f"ip:{key_by_ip(request)}"
+
+
+def key_by_route(request: Request) -> str:
+    """One budget for the whole route, whoever calls it."""
+    return "*"
+
+
+class RateLimiter:
+    """FastAPI dependency that limits how often a route can be called.
+
+    Budgets are kept per route and per key (client IP by default) and
+    `X-RateLimit-*` headers are added to every response by
+    RateLimitHeadersMiddleware, whatever response the route returns;
+    rejected requests raise RateLimitException carrying the same headers
+    plus `Retry-After`.
+
+    Examples:
+        >>> @app.get("/tasks", dependencies=[Depends(RateLimiter(times=100, period=RatePeriod.MINUTE))])
+        ... async def list_tasks(): ...
+    """
+
+    def __init__(
+        self,
+        times: int,
+        period: RatePeriod = RatePeriod.MINUTE,
+        *,
+        multiplier: int = 1,
+        algorithm: RateLimitAlgorithm = RateLimitAlgorithm.TOKEN_BUCKET,
+        key_func: KeyFunc = key_by_ip,
+        scope: Union[str, None] = None,
+        cost: int = 1,
+        backend: Union[RateLimitBackend, None] = None,
+    ):
+        self.rate = Rate(times=times, period=period, multiplier=multiplier)
+        if not 1 <= cost <= self.rate.times:
+            raise ValueError("Cost must be between 1 and the number of allowed requests")
+        self.algorithm = algorithm
+        self.key_func = key_func
+        self.scope = scope
+        self.cost = cost
+        self._backend = backend
+        # limiters with different rates or algorithms on the same route keep separate budgets
+        self._rate_key = f"{algorithm.value}:{self.rate.times}/{self.rate.seconds:g}"
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        if self._backend is None:
+            self._backend = get_rate_limit_backend()
+        return self._backend
+
+    def get_key(self, request: Request) -> str:
+        scope = self.scope
+        if scope is None:
+            route = request.scope.get("route")
+            scope = getattr(route, "path", request.url.path)
+        return f"{scope}:{self._rate_key}:{self.key_func(request)}"
+
+    async def check(self, key: str) -> Decision:
+        if self.algorithm == RateLimitAlgorithm.SLIDING_WINDOW_LOG:
+            return await self.backend.sliding_window_log(key, rate=self.rate)
+        return await self.backend.token_bucket(key, rate=self.rate, cost=self.cost)
+
+    async def __call__(self, request: Request) -> None:
+        decision = await self.check(self.get_key(request))
+        headers = decision.headers()
+        if not decision.allowed:
+            raise RateLimitException(message="Too many requests.", headers=headers)
+        # routes return their Response directly, which drops headers set on an injected one
+        rate_limit_headers = getattr(request.state, RATE_LIMIT_HEADERS_STATE, None)
+        if rate_limit_headers is None:
+            setattr(request.state, RATE_LIMIT_HEADERS_STATE, headers)
+        else:
+            rate_limit_headers.update(headers)
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    """Limiter the API routes share, `RATE_LIMIT_TIMES` requests per
+    `RATE_LIMIT_PERIOD` for each route and client."""
+    return RateLimiter(times=settings.RATE_LIMIT_TIMES, period=settings.RATE_LIMIT_PERIOD)
+
+
+class RateLimitHeadersMiddleware:
+    """Add the headers of the request's RateLimiter checks to its response."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # the Request objects of the route share this dict as their `state`
+        state = scope.setdefault("state", {})
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and RATE_LIMIT_HEADERS_STATE in state:
+                MutableHeaders(scope=message).update(state[RATE_LIMIT_HEADERS_STATE])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
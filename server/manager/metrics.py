@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.config.factory import settings
+
+logger = logging.getLogger(__name__)
+
+# PlainTextResponse appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+# label of requests that matched no route, so that scanners can't create a series per probed path
+UNMATCHED_ROUTE = "<unmatched>"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2_048, 8_192, 32_768, 131_072, 524_288, 2_097_152, 8_388_608)
+
+
+class Histogram:
+    """Fixed-bucket histogram, `counts` has one slot per bound plus `+Inf`
+    and isn't cumulative (that's done when rendering)."""
+
+    __slots__ = ("bounds", "counts", "total")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+
+class RouteMetrics:
+    """Status counts, latency and response size histograms of one route."""
+
+    __slots__ = ("statuses", "durations", "sizes")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.durations = Histogram(LATENCY_BUCKETS)
+        self.sizes = Histogram(SIZE_BUCKETS)
+
+
+class Metrics:
+    """Request metrics of one worker process.
+
+    Updated from the event loop only, where nothing is awaited between
+    reading and writing a value, so no locks are needed. Series are keyed
+    by method and route template (never the raw path) to keep their number
+    bounded.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.exceptions: Dict[str, int] = defaultdict(int)
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float, size: int) -> None:
+        entry = self.routes.get((method, route))
+        if entry is None:
+            entry = self.routes[(method, route)] = RouteMetrics()
+        entry.statuses[status_code] = entry.statuses.get(status_code, 0) + 1
+        entry.durations.observe(duration)
+        entry.sizes.observe(size)
+
+    def count_exception(self, name: str) -> None:
+        self.exceptions[name] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON serializable state, the format shared between workers."""
+        routes = self.routes.items()
+        return {
+            "pid": os.getpid(),
+            "in_flight": self.in_flight,
+            "requests": [[*key, code, count] for key, entry in routes for code, count in entry.statuses.items()],
+            "durations": [[*key, entry.durations.counts, entry.durations.total] for key, entry in routes],
+            "sizes": [[*key, entry.sizes.counts, entry.sizes.total] for key, entry in routes],
+            "exceptions": dict(self.exceptions),
+        }
+
+
+@lru_cache()
+def get_metrics() -> Metrics:
+    return Metrics()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, response size, status code
+    and in-flight requests (a `BaseHTTPMiddleware` would cost a task and a
+    stream per request)."""
+
+    def __init__(self, app: ASGIApp, metrics: Union[Metrics, None] = None):
+        self.app = app
+        self.metrics = metrics or get_metrics()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            # set by FastAPI once a route matched, holds the path template
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            metrics.observe_request(scope["method"], route, status_code, time.perf_counter() - started, size)
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_snapshot(directory: Union[str, Path], metrics: Metrics) -> None:
+    """Store the state of this worker as `<pid>.json`, atomically so that
+    a reader never sees a partial file."""
+    path = Path(directory) / f"{os.getpid()}.json"
+    temporary = path.with_suffix(".tmp")
+    temporary.write_bytes(orjson.dumps(metrics.snapshot()))
+    os.replace(temporary, path)
+
+
+def read_snapshots(directory: Union[str, Path]) -> List[Dict[str, Any]]:
+    snapshots = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            snapshots.append(orjson.loads(path.read_bytes()))
+        except (OSError, orjson.JSONDecodeError):
+            logger.warning("Skipped unreadable metrics snapshot %s", path)
+    return snapshots
+
+
+def clear_snapshots(directory: Union[str, Path, None] = None) -> None:
+    """Remove the snapshots of a previous server run, meant to be called
+    before the workers start."""
+    directory = directory or settings.METRICS_DIR
+    if not directory:
+        return
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for path in Path(directory).glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum the snapshots of all workers. Counters and histograms of exited
+    workers are kept, so totals never go down when a worker is recycled,
+    their in-flight gauge is dropped."""
+    in_flight = 0
+    requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+    durations: Dict[Tuple[str, str], List[Any]] = {}
+    sizes: Dict[Tuple[str, str], List[Any]] = {}
+    exceptions: Dict[str, int] = defaultdict(int)
+
+    for snapshot in snapshots:
+        if snapshot["pid"] == os.getpid() or is_alive(snapshot["pid"]):
+            in_flight += snapshot["in_flight"]
+        for method, route, status_code, count in snapshot["requests"]:
+            requests[(method, route, status_code)] += count
+        for target, items in ((durations, snapshot["durations"]), (sizes, snapshot["sizes"])):
+            for method, route, counts, total in items:
+                merged = target.setdefault((method, route), [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        for name, count in snapshot["exceptions"].items():
+            exceptions[name] += count
+
+    return {
+        "in_flight": in_flight,
+        "requests": [[*key, count] for key, count in requests.items()],
+        "durations": [[*key, *value] for key, value in durations.items()],
+        "sizes": [[*key, *value] for key, value in sizes.items()],
+        "exceptions": dict(exceptions),
+    }
+
+
+def collect_metrics(metrics: Union[Metrics, None] = None) -> Dict[str, Any]:
+    """Metrics of this worker, or of all workers when `METRICS_DIR` is set."""
+    metrics = metrics or get_metrics()
+    if not settings.METRICS_DIR:
+        return merge_snapshots([metrics.snapshot()])
+
+    write_snapshot(settings.METRICS_DIR, metrics)
+    return merge_snapshots(read_snapshots(settings.METRICS_DIR))
+
+
+async def run_snapshot_writer(metrics: Union[Metrics, None] = None) -> None:
+    """Periodically store the state of this worker for the other workers'
+    `/metrics`, meant to run as a background task when `METRICS_DIR` is set.
+    The last snapshot is written when the task is cancelled."""
+    metrics = metrics or get_metrics()
+    Path(settings.METRICS_DIR).mkdir(parents=True, exist_ok=True)
+    try:
+        while True:
+            try:
+                write_snapshot(settings.METRICS_DIR, metrics)
+            except OSError:
+                logger.exception("Failed to write the metrics snapshot")
+            await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+    finally:
+        write_snapshot(settings.METRICS_DIR, metrics)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, items: List[List[Any]], bounds: Sequence[float]) -> List[str]:
+    lines = []
+    for method, route, counts, total in items:
+        cumulative = 0
+        for bound, count in zip([*bounds, "+Inf"], counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {total}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {cumulative}")
+    return lines
+
+
+def render_metrics(collected: Dict[str, Any]) -> str:
+    """Prometheus text exposition format of collected metrics."""
+    lines = [
+        "# HELP http_requests_in_flight Requests being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {collected['in_flight']}",
+        "# HELP http_requests_total Requests served by method, route template and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    for method, route, status_code, count in collected["requests"]:
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Time to serve a request.",
+        "# TYPE http_request_duration_seconds histogram",
+        *_histogram_lines("http_request_duration_seconds", collected["durations"], LATENCY_BUCKETS),
+        "# HELP http_response_size_bytes Size of the response body.",
+        "# TYPE http_response_size_bytes histogram",
+        *_histogram_lines("http_response_size_bytes", collected["sizes"], SIZE_BUCKETS),
+        "# HELP http_exceptions_total Exceptions turned into responses by the exception handlers.",
+        "# TYPE http_exceptions_total counter",
+    ]
+    for name, count in collected["exceptions"].items():
+        lines.append(f"http_exceptions_total{_labels(exception=name)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,334 @@
+import base64
+import binascii
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Generic, Hashable, List, Sequence, Tuple, TypeVar, Union
+from uuid import UUID
+
+import orjson
+from sqlalchemy import Select, Table, and_, func, literal_column, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from server.manager.enums import CountMode
+from server.manager.exceptions import ServerException
+from server.manager.filters import resolve_column
+from server.manager.plans import get_plan
+from server.manager.schemas import CursorPaginationOutSchema
+from server.manager.utils import get_alias_map
+
+ItemType = TypeVar("ItemType")
+
+FORWARD = "n"
+BACKWARD = "p"
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def string_decoder(parse: Callable[[str], Any]) -> Callable[[Any], Any]:
+    """Decoder of values that cursors hold as strings."""
+
+    def decode(v: Any) -> Any:
+        if not isinstance(v, str):
+            raise TypeError("Expected a string.")
+        return parse(v)
+
+    return decode
+
+
+def number_decoder(*kinds: type) -> Callable[[Any], Any]:
+    """Decoder of values that cursors hold as JSON numbers."""
+
+    def decode(v: Any) -> Any:
+        if not isinstance(v, kinds):
+            raise TypeError("Expected a number.")
+        return v
+
+    return decode
+
+
+# by the python type of the column, checked in order (datetime is a date)
+CURSOR_DECODERS: Dict[type, Callable[[Any], Any]] = {
+    datetime: string_decoder(datetime.fromisoformat),
+    date: string_decoder(date.fromisoformat),
+    UUID: string_decoder(UUID),
+    Decimal: string_decoder(Decimal),
+    str: string_decoder(str),
+    int: number_decoder(int),
+    float: number_decoder(int, float),
+}
+# JSON types a sort value or id can be encoded as
+CURSOR_VALUE_TYPES = (str, int, float, type(None))
+
+
+def encode_cursor(value: Any, ident: Any, direction: str) -> str:
+    """Pack sort key, id and direction into an opaque url safe token."""
+    payload = orjson.dumps({"v": value, "i": ident, "d": direction}, default=str)
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode(encoding="utf-8")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError) as error:
+        raise ServerException(message="Invalid cursor.") from error
+
+    if not isinstance(payload, dict) or payload.keys() != {"v", "i", "d"} or payload["d"] not in (FORWARD, BACKWARD):
+        raise ServerException(message="Invalid cursor.")
+    if not isinstance(payload["i"], (str, int)) or not isinstance(payload["v"], CURSOR_VALUE_TYPES):
+        raise ServerException(message="Invalid cursor.")
+    return payload
+
+
+class CursorPage(Generic[ItemType]):
+    """One page of keyset paginated results."""
+
+    def __init__(
+        self, *, objects: List[ItemType], limit: int, next_cursor: Union[str, None], prev_cursor: Union[str, None]
+    ):
+        self.objects = objects
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        # only counted when asked for, see `count_total`
+        self.total_count: Union[int, None] = None
+        self.total_count_is_estimate = False
+
+    def dict(self) -> Dict[str, Any]:
+        """Converts CursorPage to the output of CursorPaginationOutSchema,
+        keyed by its field aliases like the objects it holds."""
+        aliases = get_alias_map(CursorPaginationOutSchema)
+        fields = {
+            "objects": self.objects,
+            "limit": self.limit,
+            "count": len(self.objects),
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor,
+            "total_count": self.total_count,
+            "total_count_is_estimate": self.total_count_is_estimate,
+        }
+        return {aliases[name]: value for name, value in fields.items()}
+
+
+class KeysetPaginator:
+    """Cursor based pagination ordered by a sort column with the id as tie
+    breaker.
+
+    Every page is fetched with a `(sort, id) > (:sort, :id)` seek on the
+    `(sort, id)` ordering, so page N costs the same as page one as long as
+    an index leads with the sort column. NULL sort values are placed last
+    in ascending and first in descending order (PostgreSQL defaults); the
+    rows on the other side of them are sought by a second statement once
+    the first runs out.
+
+    Examples:
+        >>> paginator = KeysetPaginator(sort_column=Task.due_at, id_column=Task.id)
+        >>> page = await paginator.paginate(session, select(Task), cursor=cursor, limit=50)
+    """
+
+    def __init__(self, *, sort_column: Any, id_column: Any, descending: bool = False, max_limit: int = MAX_LIMIT):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+        self.max_limit = max_limit
+
+        sort, ident = resolve_column(sort_column), resolve_column(id_column)
+        self.sort_key: str = sort_column.key
+        self.id_key: str = id_column.key
+        self.nullable: bool = bool(getattr(sort, "nullable", True)) and not getattr(sort, "primary_key", False)
+        self.sort_decoder = self._get_decoder(sort)
+        self.id_decoder = self._get_decoder(ident)
+
+    @staticmethod
+    def _get_decoder(column: Any) -> Any:
+        try:
+            python_type = column.type.python_type
+        except (AttributeError, NotImplementedError):
+            return None
+
+        for kind, decoder in CURSOR_DECODERS.items():
+            if issubclass(python_type, kind):
+                return decoder
+        return None
+
+    def _order_by(self, descending: bool) -> Tuple[ColumnElement, ColumnElement]:
+        if descending:
+            return self.sort_column.desc().nulls_first(), self.id_column.desc()
+        return self.sort_column.asc().nulls_last(), self.id_column.asc()
+
+    def _seek(self, value: Any, ident: Any, descending: bool) -> List[ColumnElement]:
+        """Conditions that select the rows strictly after (value, ident) in
+        the given ordering, one per phase: rows with and without a sort value
+        are sought separately, as an OR of both isn't an index condition."""
+        sort, id_column = self.sort_column, self.id_column
+        if descending:
+            if value is None:
+                return [and_(sort.is_(None), id_column < ident), sort.is_not(None)]
+            return [tuple_(sort, id_column) < tuple_(value, ident)]
+
+        if value is None:
+            return [and_(sort.is_(None), id_column > ident)]
+        after = tuple_(sort, id_column) > tuple_(value, ident)
+        return [after, sort.is_(None)] if self.nullable else [after]
+
+    def _decode(self, cursor: str) -> Tuple[Any, Any, str]:
+        payload = decode_cursor(cursor)
+        value, ident = payload["v"], payload["i"]
+        try:
+            if value is not None and self.sort_decoder is not None:
+                value = self.sort_decoder(value)
+            if self.id_decoder is not None:
+                ident = self.id_decoder(ident)
+        except (TypeError, ValueError, ArithmeticError) as error:
+            raise ServerException(message="Invalid cursor.") from error
+        return value, ident, payload["d"]
+
+    def _encode(self, item: Any, direction: str) -> str:
+        return encode_cursor(getattr(item, self.sort_key), getattr(item, self.id_key), direction)
+
+    def statements(
+        self, statement: Select, *, cursor: Union[str, None] = None, limit: int = DEFAULT_LIMIT
+    ) -> List[Select]:
+        """Build the seek statements of the page, in the order they are run
+        until the page is full; each fetches one extra row to detect whether
+        more pages exist."""
+        descending = self.descending
+        seeks: List[Union[ColumnElement, None]] = [None]
+        if cursor:
+            value, ident, direction = self._decode(cursor)
+            descending = descending != (direction == BACKWARD)
+            seeks = list(self._seek(value, ident, descending))
+
+        statement = statement.order_by(None).order_by(*self._order_by(descending)).limit(self.clamp(limit) + 1)
+        return [statement if seek is None else statement.where(seek) for seek in seeks]
+
+    def statement(self, statement: Select, *, cursor: Union[str, None] = None, limit: int = DEFAULT_LIMIT) -> Select:
+        """Build the first seek statement of the page, the only one unless the
+        cursor is next to the rows without a sort value."""
+        return self.statements(statement, cursor=cursor, limit=limit)[0]
+
+    def clamp(self, limit: int) -> int:
+        return max(1, min(limit, self.max_limit))
+
+    def page(self, items: Sequence[Any], *, cursor: Union[str, None] = None, limit: int = DEFAULT_LIMIT) -> CursorPage:
+        """Turn rows fetched with `statement()` into a page with cursors."""
+        limit = self.clamp(limit)
+        direction = decode_cursor(cursor)["d"] if cursor else FORWARD
+        objects = list(items[:limit])
+        has_more = len(items) > limit
+
+        if direction == BACKWARD:
+            objects.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, bool(cursor)
+
+        return CursorPage(
+            objects=objects,
+            limit=limit,
+            next_cursor=self._encode(objects[-1], FORWARD) if objects and has_next else None,
+            prev_cursor=self._encode(objects[0], BACKWARD) if objects and has_prev else None,
+        )
+
+    async def paginate(
+        self,
+        session: AsyncSession,
+        statement: Select,
+        *,
+        cursor: Union[str, None] = None,
+        limit: int = DEFAULT_LIMIT,
+        params: Union[Dict[str, Any], None] = None,
+        scalars: bool = True,
+    ) -> CursorPage:
+        size = self.clamp(limit) + 1
+        items: List[Any] = []
+        for seek_statement in self.statements(statement, cursor=cursor, limit=limit):
+            result = await session.execute(seek_statement.limit(size - len(items)), params)
+            items.extend(result.scalars().all() if scalars else result.all())
+            if len(items) == size:
+                break
+        return self.page(items, cursor=cursor, limit=limit)
+
+
+async def estimate_count(session: AsyncSession, table: Union[Table, str]) -> Union[int, None]:
+    """Planner estimate of the table row count from `pg_class.reltuples`.
+
+    Returns None when the table was never vacuumed/analyzed.
+    """
+    name = table if isinstance(table, str) else table.fullname
+    result = await session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+        {"name": name},
+    )
+    estimate = result.scalar()
+    return int(estimate) if estimate is not None and estimate >= 0 else None
+
+
+class CachedCount:
+    """Exact `COUNT(*)` results cached per key for `ttl` seconds."""
+
+    def __init__(self, *, ttl: float = 60.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+
+    async def get(
+        self,
+        session: AsyncSession,
+        statement: Select,
+        *,
+        key: Hashable,
+        params: Union[Dict[str, Any], None] = None,
+    ) -> int:
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        # the columns aren't read, only the rows counted
+        rows = statement.order_by(None).limit(None).with_only_columns(literal_column("1"), maintain_column_froms=True)
+        count_statement = select(func.count()).select_from(rows.subquery())
+        total = (await session.execute(count_statement, params)).scalar_one()
+        self._cache[key] = (now + self.ttl, total)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return total
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+async def estimate_rows(session: AsyncSession, statement: Select, params: Union[Dict[str, Any], None] = None) -> int:
+    """Planner estimate of the number of rows `statement` returns, read from
+    its EXPLAIN without running it."""
+    plan = await get_plan(await session.connection(), statement.order_by(None).limit(None), params)
+    return int(plan["Plan Rows"])
+
+
+async def count_total(
+    session: AsyncSession,
+    statement: Select,
+    *,
+    mode: CountMode,
+    counter: CachedCount,
+    key: Hashable,
+    params: Union[Dict[str, Any], None] = None,
+    table: Union[Table, None] = None,
+) -> Tuple[int, bool]:
+    """Total of the rows `statement` selects and whether it is an estimate.
+
+    Exact counts are cached by `key` in `counter`. Estimates come from the
+    table statistics when `table` is given (an unfiltered statement over
+    it), from the plan of the statement otherwise.
+    """
+    if mode == CountMode.EXACT:
+        return await counter.get(session, statement, key=key, params=params), False
+    if table is not None:
+        estimate = await estimate_count(session, table)
+        if estimate is not None:
+            return estimate, True
+    return await estimate_rows(session, statement, params), True
@@ -0,0 +1,85 @@
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Union
+
+from sqlalchemy import Executable, Select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ClauseElement
+
+
+class PlanCheck(NamedTuple):
+    statement: Select
+    params: Dict[str, Any]
+    # column a cursor page seeks on, it has to bound an index scan rather than filter the rows read
+    seek_column: Union[str, None] = None
+
+
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement, its bind parameters are
+    processed as for the statement itself.
+
+    Examples:
+        >>> plan = (await connection.execute(Explain(select(Task).where(...)))).scalar_one()[0]["Plan"]
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def iter_plan_nodes(plan: Mapping[str, Any]) -> Iterator[Mapping[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from iter_plan_nodes(child)
+
+
+def find_sequential_scans(plan: Mapping[str, Any], tables: Union[Iterable[str], None] = None) -> List[str]:
+    """Relations read with a sequential scan (only those of `tables` if
+    given)."""
+    tables = set(tables) if tables is not None else None
+    return [
+        node["Relation Name"]
+        for node in iter_plan_nodes(plan)
+        if node["Node Type"] == "Seq Scan" and (tables is None or node["Relation Name"] in tables)
+    ]
+
+
+def is_seek_bounded(plan: Mapping[str, Any], column: str) -> bool:
+    """Whether `column` is part of an index condition, i.e. whether the seek
+    starts the index scan at the cursor instead of filtering the rows before
+    it."""
+    pattern = re.compile(rf"\b{re.escape(column)}\b")
+    return any(pattern.search(node.get("Index Cond", "")) for node in iter_plan_nodes(plan))
+
+
+async def get_plan(connection: AsyncConnection, statement: Select, params: Union[Dict[str, Any], None] = None) -> Any:
+    result = await connection.execute(Explain(statement), params)
+    return result.scalar_one()[0]["Plan"]
+
+
+async def check_index_scans(
+    connection: AsyncConnection, checks: Mapping[str, PlanCheck], *, tables: Union[Iterable[str], None] = None
+) -> Dict[str, List[str]]:
+    """Plan every statement with sequential scans disabled and return the
+    problems of the ones still reading a table sequentially, i.e. with no
+    index matching their filter and ordering, or seeking a cursor page with
+    a filter (so the result doesn't depend on how many rows the tables
+    hold). Nothing is executed and the session setting is rolled back."""
+    failures = {}
+    async with connection.begin() as transaction:
+        await connection.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, check in checks.items():
+            plan = await get_plan(connection, check.statement, check.params)
+            problems = [f"sequential scan of {table}" for table in find_sequential_scans(plan, tables)]
+            if check.seek_column and not is_seek_bounded(plan, check.seek_column):
+                problems.append(f"{check.seek_column} filtered rather than sought")
+            if problems:
+                failures[name] = problems
+        await transaction.rollback()
+    return failures
@@ -0,0 +1,181 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.config.factory import settings
+
+logger = logging.getLogger(__name__)
+
+# statements that EXPLAIN accepts without running them
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+EXPLAIN_SAVEPOINT = "query_profiler_explain"
+LITERAL_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+"), "?"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b"), "?"),
+    # IN lists of any length share one fingerprint
+    (re.compile(r"\(\s*\?(?:::[\w ]+)?(?:\s*,\s*\?(?:::[\w ]+)?)+\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+_profile: ContextVar[Union["QueryProfile", None]] = ContextVar("query_profile", default=None)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement with literals and bound parameters replaced by `?`, so that
+    executions differing only by their values are aggregated."""
+    for pattern, replacement in LITERAL_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+class QueryStats:
+    __slots__ = ("count", "total", "durations")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.durations: List[float] = []
+
+    def p95(self) -> float:
+        durations = sorted(self.durations)
+        return durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+
+
+class QueryProfile:
+    """Statements executed while serving one request, by fingerprint."""
+
+    def __init__(self):
+        self.queries: Dict[str, QueryStats] = {}
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, statement: str, duration: float) -> None:
+        key = fingerprint(statement)
+        stats = self.queries.get(key)
+        if stats is None:
+            stats = self.queries[key] = QueryStats()
+        stats.count += 1
+        stats.total += duration
+        stats.durations.append(duration)
+        self.count += 1
+        self.total += duration
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per fingerprint count, total and p95 time (ms), slowest first."""
+        return [
+            {"statement": key, "count": stats.count, "total_ms": stats.total * 1000, "p95_ms": stats.p95() * 1000}
+            for key, stats in sorted(self.queries.items(), key=lambda item: item[1].total, reverse=True)
+        ]
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Fingerprints executed more than `threshold` times, a likely N+1."""
+        return {key: stats.count for key, stats in self.queries.items() if stats.count > threshold}
+
+
+def get_query_profile() -> Union[QueryProfile, None]:
+    return _profile.get()
+
+
+def explain(connection: Connection, statement: str, parameters: Any) -> Union[str, None]:
+    """Plan of a statement on PostgreSQL, run on the raw DBAPI cursor so the
+    EXPLAIN doesn't go through the profiler again.
+
+    Unless the connection is in autocommit mode it runs under a savepoint,
+    an EXPLAIN that fails would otherwise abort the request's transaction.
+    """
+    if connection.dialect.name != "postgresql" or not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    savepoint = not getattr(connection.connection.dbapi_connection, "autocommit", False)
+    cursor = connection.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            raise
+        if savepoint:
+            cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        return plan
+    finally:
+        cursor.close()
+
+
+def before_cursor_execute(
+    connection: Connection, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    # statements don't nest on a connection, and one that fails is overwritten by the next
+    connection.info["query_started"] = time.perf_counter()
+
+
+def after_cursor_execute(
+    connection: Connection, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    duration = time.perf_counter() - connection.info["query_started"]
+    profile = _profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+
+    if duration * 1000 < settings.QUERY_SLOW_MS:
+        return
+    plan = None
+    if settings.DEBUG and not executemany:
+        try:
+            plan = explain(connection, statement, parameters)
+        except Exception:
+            logger.exception("Failed to explain the slow query")
+    logger.warning("Slow query (%.1f ms): %s%s", duration * 1000, fingerprint(statement), f"\n{plan}" if plan else "")
+
+
+def install_query_profiler(engine: AsyncEngine) -> None:
+    """Time every statement of the engine, recorded to the request profile
+    when there is one; slow ones are logged with their plan in debug mode."""
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+class QueryProfilerMiddleware:
+    """Collect a `QueryProfile` per request and warn about N+1 patterns; in
+    debug mode the database time is reported in a `Server-Timing` header
+    (statements run once the headers are sent aren't included there)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.QUERY_PROFILER:
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _profile.set(profile)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={profile.total * 1000:.2f};desc="{profile.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+            for statement, count in profile.repeated(settings.QUERY_N_PLUS_ONE_THRESHOLD).items():
+                logger.warning(
+                    "Possible N+1, %d executions in %s %s: %s", count, scope["method"], scope["path"], statement
+                )
+            if profile.count and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s %s queries: %s", scope["method"], scope["path"], profile.summary())
@@ -0,0 +1,94 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Union
+
+import orjson
+from fastapi import status as http_status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from pydantic.json import timedelta_isoformat
+from sqlalchemy import Row
+
+from server.manager.enums import ClientEndStatus
+from server.manager.utils import get_timestamp
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def orjson_default(v: Any) -> Any:
+    """Fallback of orjson for values it doesn't serialize natively.
+
+    Datetime objects are passed through orjson so that they get the same
+    millisecond timestamps as `BaseOutSchema`.
+    """
+    if isinstance(v, datetime):
+        return get_timestamp(v)
+    if isinstance(v, BaseModel):
+        return v.dict(by_alias=True)
+    if isinstance(v, Row):
+        return v._asdict()
+    if isinstance(v, (date, time)):
+        return v.isoformat()
+    if isinstance(v, timedelta):
+        return timedelta_isoformat(v)
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, (set, frozenset)):
+        return list(v)
+    raise TypeError(f"Object of type {type(v).__name__} is not JSON serializable")
+
+
+def render_envelope(
+    data: Any = None,
+    *,
+    message: str,
+    status: ClientEndStatus = ClientEndStatus.SUCCESS,
+    code: int = http_status.HTTP_200_OK,
+) -> bytes:
+    """Serialize the client end structure straight to JSON bytes."""
+    return orjson.dumps(
+        {"status": status, "data": data, "message": message, "code": code},
+        default=orjson_default,
+        option=ORJSON_OPTIONS,
+    )
+
+
+class EnvelopeResponse(ORJSONResponse):
+    """Response in the ClientOutSchema shape, built without validation.
+
+    Meant for data that is already trusted (rows read from our database or
+    schemas built by the backend): it is written straight to orjson bytes,
+    skipping the `ClientOutSchema` re-validation and the `jsonable_encoder`
+    pass FastAPI does for returned models. Plain dicts and rows are the
+    fastest input, SQLAlchemy rows are written as mappings and pydantic
+    models are converted with `.dict(by_alias=True)`. As a JSON response
+    class the `response_model` is still documented in the OpenAPI schema.
+
+    Examples:
+        >>> @app.get(
+        ...     "/tasks",
+        ...     response_model=ClientOutSchema[List[TaskOutSchema]],
+        ...     response_class=EnvelopeResponse,
+        ...     status_code=http_status.HTTP_200_OK,  # the response class has no default for OpenAPI to pick up
+        ... )
+        ... async def list_tasks():
+        ...     return EnvelopeResponse(rows, message="Tasks.")
+    """
+
+    def __init__(
+        self,
+        data: Any = None,
+        *,
+        message: str = "",
+        status: ClientEndStatus = ClientEndStatus.SUCCESS,
+        code: int = http_status.HTTP_200_OK,
+        status_code: Union[int, None] = None,
+        headers: Union[Dict[str, str], None] = None,
+    ):
+        self.envelope_status = status
+        self.message = message
+        self.code = code
+        super().__init__(content=data, status_code=status_code or code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return render_envelope(content, message=self.message, status=self.envelope_status, code=self.code)
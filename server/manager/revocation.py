@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Union
+
+from fastapi import status
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from server.config.factory import settings
+from server.manager.db import get_session_factory
+from server.manager.enums import ClientEndStatus
+from server.manager.exceptions import ServerException
+from server.manager.utils import get_utc_timezone, utc_now
+from server.models.tokens import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# revocations committed out of order with their `revoked_at` are still picked up by the next sync
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Bit array set membership with no false negatives.
+
+    Sized for `capacity` items at `error_rate` false positives, the k bit
+    positions come from two halves of one blake2b digest (double hashing).
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> List[int]:
+        digest = hashlib.blake2b(item.encode(encoding="utf-8"), digest_size=16).digest()
+        first, second, size = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1, self.size
+        return [(first + index * second) % size for index in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """Revoked token ids with an in-memory fast path.
+
+    Revocations are persisted in `revoked_tokens`; every worker mirrors the
+    unexpired ones in a Bloom filter that is updated incrementally every
+    `sync_seconds` and rebuilt (dropping expired entries) every
+    `rebuild_seconds`. A token missing from the filter is definitely not
+    revoked and costs no I/O, only filter hits are confirmed against the
+    table. Until the first load succeeds every check goes to the table.
+    Revocations made by another worker become visible within one sync.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: Union[async_sessionmaker[AsyncSession], None] = None,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        sync_seconds: float = 5.0,
+        rebuild_seconds: float = 300.0,
+    ):
+        self._session_factory = session_factory or get_session_factory()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.ready = False
+        self.store_lookups = 0
+        self._filter = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self._watermark: Union[datetime, None] = None
+
+    async def revoke(self, *, jti: str, expires_at: datetime) -> None:
+        async with self._session_factory.begin() as session:
+            statement = insert(RevokedToken).values(jti=jti, expires_at=expires_at)
+            await session.execute(statement.on_conflict_do_nothing(index_elements=[RevokedToken.jti]))
+        self._filter.add(jti)
+
+    async def revoke_payload(self, payload: Mapping[str, Any]) -> None:
+        """Revoke a token by the claims `TokenManager.read_code` returned."""
+        await self.revoke(
+            jti=payload["jti"],
+            expires_at=datetime.fromtimestamp(payload["exp"], tz=get_utc_timezone()),
+        )
+
+    async def is_revoked(self, jti: str) -> bool:
+        if self.ready and jti not in self._filter:
+            return False
+
+        self.store_lookups += 1
+        async with self._session_factory() as session:
+            statement = select(exists().where(RevokedToken.jti == jti, RevokedToken.expires_at > func.now()))
+            return bool((await session.execute(statement)).scalar())
+
+    async def ensure_not_revoked(self, payload: Mapping[str, Any]) -> None:
+        """Raise for revoked tokens, tokens without `jti` are rejected as they
+        can't be revoked."""
+        jti = payload.get("jti")
+        if not jti or await self.is_revoked(jti):
+            raise ServerException(
+                message="Token has been revoked.",
+                code=status.HTTP_401_UNAUTHORIZED,
+                status=ClientEndStatus.FAIL,
+            )
+
+    async def rebuild(self) -> None:
+        """Load every unexpired revocation into a fresh filter."""
+        async with self._session_factory() as session:
+            count = (
+                await session.execute(select(func.count()).where(RevokedToken.expires_at > func.now()))
+            ).scalar_one()
+            bloom = BloomFilter(capacity=max(self.capacity, count * 2), error_rate=self.error_rate)
+            watermark = await self._load(session, bloom, since=None)
+
+        self._filter, self._watermark, self.ready = bloom, watermark, True
+
+    async def sync(self) -> None:
+        """Add revocations made since the last load to the current filter."""
+        if not self.ready:
+            return await self.rebuild()
+
+        async with self._session_factory() as session:
+            self._watermark = await self._load(session, self._filter, since=self._watermark)
+
+    async def _load(self, session: AsyncSession, bloom: BloomFilter, *, since: Union[datetime, None]) -> datetime:
+        statement = select(RevokedToken.jti, RevokedToken.revoked_at).where(RevokedToken.expires_at > func.now())
+        if since is not None:
+            statement = statement.where(RevokedToken.revoked_at > since - SYNC_OVERLAP)
+
+        watermark = since or utc_now() - SYNC_OVERLAP
+        result = await session.stream(statement.execution_options(yield_per=10_000))
+        async for jti, revoked_at in result:
+            bloom.add(jti)
+            watermark = max(watermark, revoked_at)
+        return watermark
+
+    async def prune(self) -> int:
+        """Delete revocations of tokens that expired anyway."""
+        async with self._session_factory.begin() as session:
+            result = await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= func.now()))
+        return result.rowcount
+
+    async def run(self) -> None:
+        """Keep the filter up to date, meant to run as a background task."""
+        last_rebuild = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_rebuild >= self.rebuild_seconds:
+                    await self.prune()
+                    await self.rebuild()
+                    last_rebuild = time.monotonic()
+                else:
+                    await self.sync()
+            except Exception:
+                logger.exception("Failed to refresh the token revocation list")
+            await asyncio.sleep(self.sync_seconds)
+
+    def stats(self) -> Dict[str, Union[int, bool]]:
+        return {"ready": self.ready, "filter_items": self._filter.count, "store_lookups": self.store_lookups}
+
+
+@lru_cache()
+def get_revocation_list() -> RevocationList:
+    return RevocationList(
+        capacity=settings.REVOCATION_BLOOM_CAPACITY,
+        error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+        sync_seconds=settings.REVOCATION_SYNC_SECONDS,
+        rebuild_seconds=settings.REVOCATION_REBUILD_SECONDS,
+    )
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Union
+from uuid import UUID
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    Select,
+    String,
+    Uuid,
+    bindparam,
+    column,
+    delete,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    true,
+    union_all,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from server.config.factory import settings
+from server.manager.db import get_session_factory
+from server.manager.enums import RatePeriod
+from server.manager.utils import as_utc, get_utc_timezone
+from server.models.stats import RollupWatermark, TaskStats, TaskStatsEntry
+from server.models.tasks import Task
+
+logger = logging.getLogger(__name__)
+
+TASK_STATS = "task_stats"
+# `date_trunc` field of every period tasks are rolled up by
+ROLLUP_PERIODS: Dict[RatePeriod, str] = {RatePeriod.HOUR: "hour", RatePeriod.DAY: "day", RatePeriod.WEEK: "week"}
+# rollup key of the tasks without a project
+NO_PROJECT = UUID(int=0)
+EPOCH = datetime(1970, 1, 1, tzinfo=get_utc_timezone())
+# advisory lock held while the rollup is written, so that the refresh loops of all workers take turns
+TASK_STATS_LOCK = zlib.crc32(TASK_STATS.encode(encoding="utf-8"))
+
+
+def truncate(moment: datetime, period: RatePeriod) -> datetime:
+    """Start of the bucket holding `moment`, as `date_trunc` in UTC (weeks
+    start on Monday)."""
+    moment = as_utc(moment)
+    if period == RatePeriod.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if period == RatePeriod.DAY else day - timedelta(days=day.weekday())
+
+
+def build_fold_statement() -> Select:
+    """Fold the tasks updated after `:since` into `task_stats`.
+
+    The contribution recorded for those tasks is taken back, their current
+    one added and recorded in its place, all in one statement so that it
+    works on one snapshot of `tasks`; folding a task that didn't change
+    adds nothing. Returns the number of tasks folded and their latest
+    `updated_at`.
+    """
+    changed = (
+        select(
+            Task.id,
+            func.coalesce(Task.project_id, literal(NO_PROJECT, Uuid)).label("project_id"),
+            Task.created_at,
+            Task.completed_at,
+            Task.updated_at,
+        )
+        .where(Task.updated_at > bindparam("since", type_=Task.updated_at.type))
+        .cte("changed")
+    )
+    previous = (
+        select(TaskStatsEntry.project_id, TaskStatsEntry.created_at, TaskStatsEntry.completed_at)
+        .join(changed, changed.c.id == TaskStatsEntry.task_id)
+        .cte("previous")
+    )
+    one, zero, minus_one = (literal_column(value, Integer) for value in ("1", "0", "-1"))
+    events = union_all(
+        select(changed.c.project_id, changed.c.created_at.label("at"), one.label("created"), zero.label("completed")),
+        select(changed.c.project_id, changed.c.completed_at, zero, one).where(changed.c.completed_at.is_not(None)),
+        select(previous.c.project_id, previous.c.created_at, minus_one, zero),
+        select(previous.c.project_id, previous.c.completed_at, zero, minus_one).where(
+            previous.c.completed_at.is_not(None)
+        ),
+    ).cte("events")
+    periods = values(column("period", String), column("field", String), name="periods", literal_binds=True).data(
+        [(period.value, field) for period, field in ROLLUP_PERIODS.items()]
+    )
+    bucketed = (
+        select(
+            periods.c.period,
+            func.date_trunc(periods.c.field, events.c.at, literal_column("'UTC'"), type_=DateTime(timezone=True)).label(
+                "bucket"
+            ),
+            events.c.project_id,
+            events.c.created,
+            events.c.completed,
+        )
+        .select_from(events.join(periods, true()))
+        .subquery("bucketed")
+    )
+    created, completed = func.sum(bucketed.c.created), func.sum(bucketed.c.completed)
+    deltas = (
+        select(bucketed.c.period, bucketed.c.bucket, bucketed.c.project_id, created, completed)
+        .group_by(bucketed.c.period, bucketed.c.bucket, bucketed.c.project_id)
+        .having(or_(created != 0, completed != 0))
+    )
+
+    rollup = insert(TaskStats).from_select(["period", "bucket", "project_id", "created", "completed"], deltas)
+    rollup = rollup.on_conflict_do_update(
+        index_elements=[TaskStats.period, TaskStats.bucket, TaskStats.project_id],
+        set_={
+            "created": TaskStats.created + rollup.excluded.created,
+            "completed": TaskStats.completed + rollup.excluded.completed,
+        },
+    )
+    entries = insert(TaskStatsEntry).from_select(
+        ["task_id", "project_id", "created_at", "completed_at"],
+        select(changed.c.id, changed.c.project_id, changed.c.created_at, changed.c.completed_at),
+    )
+    entries = entries.on_conflict_do_update(
+        index_elements=[TaskStatsEntry.task_id],
+        set_={name: entries.excluded[name] for name in ("project_id", "created_at", "completed_at")},
+    )
+    return (
+        select(func.count(), func.max(changed.c.updated_at))
+        .select_from(changed)
+        .add_cte(rollup.cte("folded_stats"), entries.cte("folded_entries"))
+    )
+
+
+fold_statement = build_fold_statement()
+stats_statement = (
+    select(
+        TaskStats.bucket,
+        func.sum(TaskStats.created).label("created"),
+        func.sum(TaskStats.completed).label("completed"),
+    )
+    .where(
+        TaskStats.period == bindparam("period"),
+        TaskStats.bucket >= bindparam("start", type_=TaskStats.bucket.type),
+        TaskStats.bucket < bindparam("end", type_=TaskStats.bucket.type),
+    )
+    .group_by(TaskStats.bucket)
+    .order_by(TaskStats.bucket)
+)
+project_stats_statement = stats_statement.where(TaskStats.project_id == bindparam("project_id", type_=Uuid()))
+
+
+class TaskStatsRollup:
+    """Tasks created and completed per project by hour, day and week.
+
+    `refresh` folds in the tasks updated since the watermark, so its cost
+    follows the number of changes, and reports read `task_stats` only, so
+    theirs follows the time range. Changes are re-read for
+    `overlap_seconds` before the watermark, as a transaction may commit
+    after one that started later. Refreshes take turns on an advisory
+    lock, a worker that doesn't get it skips the round.
+
+    Tasks deleted, or left without a project by a project deletion, don't
+    bump `updated_at`; `rebuild` counts everything again.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: Union[async_sessionmaker[AsyncSession], None] = None,
+        refresh_seconds: float = 60.0,
+        overlap_seconds: float = 60.0,
+    ):
+        self._session_factory = session_factory or get_session_factory()
+        self.refresh_seconds = refresh_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+
+    async def refresh(self) -> Union[int, None]:
+        """Fold in the changed tasks, returns how many were read or None when
+        another refresh holds the lock."""
+        async with self._session_factory.begin() as session:
+            if not (await session.execute(select(func.pg_try_advisory_xact_lock(TASK_STATS_LOCK)))).scalar():
+                return None
+            return await self._fold(session)
+
+    async def rebuild(self) -> int:
+        """Count every task again, waiting for a running refresh to finish.
+        Reports keep reading the previous counts until it commits."""
+        async with self._session_factory.begin() as session:
+            await session.execute(select(func.pg_advisory_xact_lock(TASK_STATS_LOCK)))
+            await session.execute(delete(TaskStats))
+            await session.execute(delete(TaskStatsEntry))
+            await session.execute(delete(RollupWatermark).where(RollupWatermark.name == TASK_STATS))
+            return await self._fold(session)
+
+    async def _fold(self, session: AsyncSession) -> int:
+        watermark = await get_watermark(session)
+        since = watermark - self.overlap if watermark is not None else EPOCH
+        count, latest = (await session.execute(fold_statement, {"since": since})).one()
+        if latest is not None and (watermark is None or latest > watermark):
+            statement = insert(RollupWatermark).values(name=TASK_STATS, watermark=latest)
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[RollupWatermark.name], set_={"watermark": statement.excluded.watermark}
+                )
+            )
+        return count
+
+    async def run(self) -> None:
+        """Keep the rollup up to date, meant to run as a background task."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the task statistics")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+async def get_watermark(session: AsyncSession) -> Union[datetime, None]:
+    """Time up to which task changes are counted in the rollup."""
+    statement = select(RollupWatermark.watermark).where(RollupWatermark.name == TASK_STATS)
+    return (await session.execute(statement)).scalar()
+
+
+async def get_task_stats(
+    session: AsyncSession,
+    *,
+    period: RatePeriod,
+    start: datetime,
+    end: datetime,
+    project_id: Union[UUID, None] = None,
+) -> List[Dict[str, Any]]:
+    """Tasks created and completed per bucket from the one holding `start`
+    up to `end` (excluded), over all projects unless `project_id` is given.
+    Every bucket is listed, the empty ones with zeros."""
+    start = truncate(start, period)
+    params: Dict[str, Any] = {"period": period.value, "start": start, "end": end}
+    statement = stats_statement
+    if project_id is not None:
+        statement, params["project_id"] = project_stats_statement, project_id
+    counts = {row.bucket: row for row in await session.execute(statement, params)}
+
+    buckets, bucket, step = [], start, timedelta(**{period.value: 1})
+    while bucket < end:
+        row = counts.get(bucket)
+        buckets.append(
+            {"bucket": bucket, "created": row.created if row else 0, "completed": row.completed if row else 0}
+        )
+        bucket += step
+    return buckets
+
+
+@lru_cache()
+def get_task_stats_rollup() -> TaskStatsRollup:
+    return TaskStatsRollup(
+        refresh_seconds=settings.TASK_STATS_REFRESH_SECONDS, overlap_seconds=settings.TASK_STATS_OVERLAP_SECONDS
+    )
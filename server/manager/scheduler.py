@@ -0,0 +1,298 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import zlib
+from collections import defaultdict
+from contextlib import suppress
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple, Union
+
+from sqlalchemy import Row, bindparam, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from server.config.factory import settings
+from server.manager.db import get_engine
+from server.manager.enums import TaskEvent
+from server.manager.utils import get_utc_timezone, utc_now
+from server.models.tasks import OPEN_STATUSES, Task
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=get_utc_timezone())
+# session advisory lock of the worker running the scheduler
+SCHEDULER_LOCK = zlib.crc32(b"task_scheduler")
+# tasks marked per statement when many events are due at once
+FIRE_BATCH = 1_000
+# changes are re-read this long before the last sync, for transactions that commit after later ones
+SYNC_OVERLAP = timedelta(seconds=60)
+
+Handler = Callable[[Row], Awaitable[None]]
+TimerKey = Tuple[TaskEvent, Any]
+
+
+class TimerHeap:
+    """Timers by fire time on a binary heap.
+
+    Rescheduling or cancelling a key leaves its previous heap entry in
+    place, it is skipped when it reaches the top and the heap is rebuilt
+    once such stale entries outnumber the live ones.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable, Any]] = []
+        self._entries: Dict[Hashable, Tuple[float, int, Hashable, Any]] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def schedule(self, key: Hashable, when: float, value: Any = None) -> None:
+        # the sequence number breaks ties, keys and values are never compared; tuples compare faster than lists
+        entry = (when, next(self._counter), key, value)
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+
+    def cancel(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def _discard_stale(self) -> None:
+        heap, entries = self._heap, self._entries
+        while heap and entries.get(heap[0][2]) is not heap[0]:
+            heapq.heappop(heap)
+
+    def next_time(self) -> Union[float, None]:
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: Union[int, None] = None) -> List[Tuple[Hashable, Any]]:
+        """Remove and return the (key, value) of the timers due at `now`,
+        earliest first."""
+        due: List[Tuple[Hashable, Any]] = []
+        heap, entries = self._heap, self._entries
+        while heap and heap[0][0] <= now and (limit is None or len(due) < limit):
+            entry = heapq.heappop(heap)
+            if entries.get(entry[2]) is entry:
+                del entries[entry[2]]
+                due.append((entry[2], entry[3]))
+        return due
+
+
+def build_fire_statement(event: TaskEvent) -> Any:
+    """Set the marker of `event` on the given (id, due_at) pairs whose event
+    is still pending: open, same due date and not fired for it yet. The
+    marker update is the only trace of an event, so whatever fires it
+    first wins and the rest is a no-op."""
+    marker = Task.reminded_for if event == TaskEvent.REMINDER else Task.overdue_for
+    # reminders of tasks that are past due by now are dropped, the overdue transition replaces them
+    timing = Task.due_at > func.now() if event == TaskEvent.REMINDER else Task.due_at <= func.now()
+    return (
+        update(Task)
+        .where(
+            tuple_(Task.id, Task.due_at).in_(bindparam("keys", expanding=True)),
+            Task.status.in_(bindparam("open_statuses", OPEN_STATUSES, literal_execute=True)),
+            marker.is_distinct_from(Task.due_at),
+            timing,
+        )
+        # markers aren't changes of the task, `updated_at` is kept
+        .values({marker: Task.due_at, Task.updated_at: Task.updated_at})
+        .returning(Task.id, Task.title, Task.due_at, Task.project_id, Task.assignee_id)
+    )
+
+
+pending_columns = (Task.id, Task.status, Task.due_at, Task.reminded_for, Task.overdue_for)
+pending_conditions = (
+    Task.status.in_(bindparam("open_statuses", OPEN_STATUSES, literal_execute=True)),
+    Task.due_at < bindparam("due_before", type_=Task.due_at.type),
+    (Task.reminded_for.is_distinct_from(Task.due_at)) | (Task.overdue_for.is_distinct_from(Task.due_at)),
+)
+# open tasks by due date, the partial index on open tasks serves the range and the order
+window_statement = (
+    select(*pending_columns)
+    .where(Task.due_at >= bindparam("due_from", type_=Task.due_at.type), *pending_conditions)
+    .order_by(Task.due_at)
+    .limit(bindparam("limit"))
+)
+changes_statement = select(*pending_columns).where(
+    Task.updated_at > bindparam("since", type_=Task.updated_at.type), *pending_conditions
+)
+fire_statements = {event: build_fire_statement(event) for event in TaskEvent}
+
+
+class TaskScheduler:
+    """Fires task reminders (`reminder_seconds` before the due date) and
+    overdue transitions on time, handlers run once the event is committed.
+
+    One worker runs it at a time, the one holding a session advisory lock
+    on a dedicated connection; the others retry every `sync_seconds` and
+    take over once the leader's connection goes away. Only the events of
+    the next `window_seconds` are held in memory, read from the partial
+    index of open tasks by due date (at most `max_items` at once, which has
+    to exceed the number of tasks due at the same instant). Tasks changed
+    since the last sync are read by `updated_at` every `sync_seconds` (or
+    at once after `request_sync`) and rescheduled, timers of tasks that
+    changed otherwise are left to expire.
+
+    An event fires by setting its marker to the due date it fired for,
+    under the conditions that made it pending, so a leftover timer or an
+    event already fired by a previous leader changes nothing and every
+    event fires exactly once.
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: Union[AsyncEngine, None] = None,
+        reminder_seconds: float = 900.0,
+        window_seconds: float = 600.0,
+        sync_seconds: float = 5.0,
+        max_items: int = 100_000,
+    ):
+        self._engine = engine or get_engine()
+        self.lead = timedelta(seconds=reminder_seconds)
+        self.window = timedelta(seconds=window_seconds)
+        self.sync_seconds = sync_seconds
+        self.max_items = max_items
+        self.handlers: Dict[TaskEvent, List[Handler]] = defaultdict(list)
+        self.fired: Dict[TaskEvent, int] = {event: 0 for event in TaskEvent}
+        self.leader = False
+        self._timers = TimerHeap()
+        self._sync_requested = asyncio.Event()
+        self._window_end = EPOCH
+        self._loaded_due = EPOCH
+        self._synced_at = EPOCH
+
+    def on(self, event: TaskEvent, handler: Handler) -> None:
+        """Call `handler` with the task row of every `event` fired."""
+        self.handlers[event].append(handler)
+
+    def request_sync(self) -> None:
+        """Read the changed tasks now rather than at the next sync, e.g. after
+        a write (only the worker running the scheduler reacts)."""
+        self._sync_requested.set()
+
+    def _schedule(self, row: Row, now: datetime) -> None:
+        """(Re)schedule the pending events of a task that fall in the window."""
+        for event in TaskEvent:
+            self._timers.cancel((event, row.id))
+        due = row.due_at
+        if row.status not in OPEN_STATUSES or due is None:
+            return
+        if row.reminded_for != due and due > now and due - self.lead < self._window_end:
+            self._timers.schedule((TaskEvent.REMINDER, row.id), (due - self.lead).timestamp(), due)
+        if row.overdue_for != due and due < self._window_end:
+            self._timers.schedule((TaskEvent.OVERDUE, row.id), due.timestamp(), due)
+
+    async def _load(self, connection: AsyncConnection, until: datetime) -> None:
+        """Extend the window to `until`, or less when `max_items` tasks are
+        read before."""
+        params = {"due_from": self._loaded_due, "due_before": until + self.lead, "limit": self.max_items}
+        rows = (await connection.execute(window_statement, params)).all()
+        await connection.commit()
+        if len(rows) == self.max_items:
+            # the window ends with the last due date read, the next load starts from it
+            until = rows[-1].due_at - self.lead
+            logger.warning("Task scheduler window cut to %s, %d tasks due before", until, self.max_items)
+        self._window_end, self._loaded_due = until, until + self.lead
+        now = utc_now()
+        for row in rows:
+            self._schedule(row, now)
+
+    async def _sync(self, connection: AsyncConnection) -> None:
+        synced_at = (await connection.execute(select(func.now()))).scalar_one()
+        params = {"since": self._synced_at - SYNC_OVERLAP, "due_before": self._window_end + self.lead}
+        rows = (await connection.execute(changes_statement, params)).all()
+        await connection.commit()
+        self._synced_at = synced_at
+        now = utc_now()
+        for row in rows:
+            self._schedule(row, now)
+
+    async def _fire(self, connection: AsyncConnection, due: List[Tuple[TimerKey, datetime]]) -> None:
+        keys: Dict[TaskEvent, List[Tuple[Any, datetime]]] = defaultdict(list)
+        for (event, task_id), due_at in due:
+            keys[event].append((task_id, due_at))
+
+        for event, event_keys in keys.items():
+            for offset in range(0, len(event_keys), FIRE_BATCH):
+                batch = event_keys[offset : offset + FIRE_BATCH]
+                rows = (await connection.execute(fire_statements[event], {"keys": batch})).all()
+                await connection.commit()
+                self.fired[event] += len(rows)
+                for row in rows:
+                    for handler in self.handlers[event]:
+                        try:
+                            await handler(row)
+                        except Exception:
+                            logger.exception("Task %s handler failed for task %s", event.value, row.id)
+
+    async def _lead(self, connection: AsyncConnection) -> None:
+        loop = asyncio.get_running_loop()
+        self._synced_at = (await connection.execute(select(func.now()))).scalar_one()
+        await self._load(connection, utc_now() + self.window)
+        next_sync = loop.time() + self.sync_seconds
+        while True:
+            now = utc_now()
+            due = self._timers.pop_due(now.timestamp())
+            if due:
+                await self._fire(connection, due)
+            if self._sync_requested.is_set() or loop.time() >= next_sync:
+                self._sync_requested.clear()
+                await self._sync(connection)
+                next_sync = loop.time() + self.sync_seconds
+            if self._window_end - now < self.window / 2:
+                await self._load(connection, max(self._window_end, now) + self.window)
+
+            timeout = next_sync - loop.time()
+            next_time = self._timers.next_time()
+            if next_time is not None:
+                timeout = min(timeout, next_time - utc_now().timestamp())
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._sync_requested.wait(), timeout=max(timeout, 0.0))
+
+    async def run(self) -> None:
+        """Run the scheduler whenever this worker gets the lock, meant to run
+        as a background task."""
+        while True:
+            try:
+                async with self._engine.connect() as connection:
+                    acquired = (await connection.execute(select(func.pg_try_advisory_lock(SCHEDULER_LOCK)))).scalar()
+                    await connection.commit()
+                    if acquired:
+                        self.leader = True
+                        try:
+                            await self._lead(connection)
+                        finally:
+                            # the connection goes back to the pool, the lock mustn't stay with it
+                            with suppress(Exception):
+                                await connection.rollback()
+                                await connection.execute(select(func.pg_advisory_unlock(SCHEDULER_LOCK)))
+                                await connection.commit()
+            except Exception:
+                logger.exception("Task scheduler failed")
+            finally:
+                self.leader = False
+                self._timers = TimerHeap()
+                self._window_end = self._loaded_due = EPOCH
+            await asyncio.sleep(self.sync_seconds)
+
+    def stats(self) -> Dict[str, Union[int, bool]]:
+        return {
+            "leader": self.leader,
+            "scheduled": len(self._timers),
+            **{f"fired_{event.value}": count for event, count in self.fired.items()},
+        }
+
+
+@lru_cache()
+def get_task_scheduler() -> TaskScheduler:
+    return TaskScheduler(
+        reminder_seconds=settings.TASK_REMINDER_SECONDS,
+        window_seconds=settings.TASK_SCHEDULER_WINDOW_SECONDS,
+        sync_seconds=settings.TASK_SCHEDULER_SYNC_SECONDS,
+        max_items=settings.TASK_SCHEDULER_MAX_ITEMS,
+    )
@@ -1,12 +1,14 @@
 from datetime import datetime, timedelta
-from typing import Any, Generic, List, Union
+from typing import Any, Generic, Iterable, List, Type, Union
 from uuid import UUID
 
 import orjson
 import pydantic
+from fastapi import status as http_status
 from pydantic import AnyHttpUrl, BaseModel, Field
 from pydantic.generics import GenericModel
 
+from server.manager.construct import get_trusted_builder
 from server.manager.enums import ClientEndStatus
 from server.manager.types import ObjectsVar, SchemaType, StrOrNone, Timestamp
 from server.manager.utils import get_timestamp, orjson_dumps, to_camel_case
@@ -24,6 +26,26 @@ class BaseInSchema(BaseModel):
         use_enum_values = True
         validate_assignment = True
 
+    @classmethod
+    def from_trusted(cls: Type[SchemaType], source: Any) -> SchemaType:
+        """Build the schema from an ORM object, row or mapping without
+        validation.
+
+        Only for data read from our own database, values are converted
+        the way the field validators would (e.g. datetime to Timestamp) but
+        never checked.
+        """
+        return get_trusted_builder(cls)(source)
+
+    @classmethod
+    def from_rows(cls: Type[SchemaType], rows: Iterable[Any], *, trusted: bool = False) -> List[SchemaType]:
+        """Build one schema per row, validated through `from_orm` unless the
+        endpoint opts into the `trusted` path."""
+        if trusted:
+            build = get_trusted_builder(cls)
+            return [build(row) for row in rows]
+        return [cls.from_orm(row) for row in rows]
+
 
 class OutputAliasConfig(BaseModel):
     class Config:
@@ -51,7 +73,7 @@ class ClientOutSchema(GenericModel, Generic[SchemaType]):
     status: ClientEndStatus = Field(default=ClientEndStatus.SUCCESS)
     data: Union[SchemaType, None] = Field(default=None)
     message: str = Field(default=...)
-    code: int = Field(default=status.HTTP_200_OK)
+    code: int = Field(default=http_status.HTTP_200_OK)
 
 
 class UnprocessableEntityOutSchema(BaseOutSchema):
@@ -87,6 +109,7 @@ class TokenPayloadSchema(BaseOutSchema):
     exp: Timestamp
     nbf: Timestamp
     iss: str
+    jti: StrOrNone = None
 
 
 class TokenOptionsSchema(BaseOutSchema):
@@ -119,3 +142,34 @@ class ClientPaginationOutSchema(ClientOutSchema):
     """Cover PaginationOutSchema with client end structure."""
 
     data: PaginationOutSchema
+
+
+class CursorPaginationOutSchema(BaseOutSchema, GenericModel, Generic[ObjectsVar], OutputAliasConfig):
+    """Generic OutSchema that uses for keyset (cursor) pagination."""
+
+    objects: List[ObjectsVar]
+    limit: int = Field(default=100)
+    count: int = Field(default=0, description="Number of objects returned in this response.")
+    next_cursor: StrOrNone = Field(default=None, title="Next page cursor")
+    prev_cursor: StrOrNone = Field(default=None, title="Previous page cursor")
+    total_count: Union[int, None] = Field(default=None, description="Number of objects for this query, if requested.")
+    total_count_is_estimate: bool = Field(default=False, description="Whether total count is a planner estimate.")
+
+
+class ClientCursorPaginationOutSchema(ClientOutSchema):
+    """Cover CursorPaginationOutSchema with client end structure."""
+
+    data: CursorPaginationOutSchema
+
+
+class ImportReportOutSchema(BaseOutSchema, OutputAliasConfig):
+    """Outcome of a bulk import."""
+
+    received: int = Field(default=0, description="Number of records read from the input.")
+    inserted: int = Field(default=0, description="Number of records created.")
+    updated: int = Field(default=0, description="Number of existing records changed.")
+    unchanged: int = Field(default=0, description="Number of existing records that already had the same values.")
+    rejected: int = Field(default=0, description="Number of records that failed validation.")
+    duplicates: int = Field(default=0, description="Number of records superseded by a later one with the same key.")
+    errors: List[UnprocessableEntityOutSchema] = Field(default=[])
+    errors_truncated: bool = Field(default=False, description="Whether only the first errors are listed.")
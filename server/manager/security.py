@@ -1,28 +1,38 @@
+import asyncio
+import hashlib
+import os
 import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Sequence, Type, TypeAlias, Union
+from functools import lru_cache
+from typing import Any, Callable, Dict, Sequence, Tuple, Type, TypeAlias, TypeVar, Union
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from fastapi import status
 from pydantic import BaseModel
 
 from server.config.factory import settings
-from server.manager.enums import TokenAudience
+from server.manager.enums import ClientEndStatus, HashingPoolType, TokenAudience
 from server.manager.exceptions import ServerException
+from server.manager.revocation import get_revocation_list
 from server.manager.schemas import TokenOptionsSchema
-from server.manager.utils import utc_now
+from server.manager.utils import id_v4, utc_now
+
+# passlib and python-jose (with its crypto backends) are imported where they are first used, they make up a large
+# part of the import time otherwise; `warm_up` loads them ahead of the first request
 
 DatetimeOrNone: TypeAlias = Union[datetime, None]
+ResultType = TypeVar("ResultType")
+Payload: TypeAlias = Dict[str, Union[int, float, str, dict, list, bool]]
 
 
 class HashGenerator:
     def __init__(self):
-        self._hash_ctx_layer_1: CryptContext = CryptContext(
-            schemes=[settings.HASHING_ALGORITHM_LAYER_1], deprecated="auto"
-        )
-        self._hash_ctx_layer_2: CryptContext = CryptContext(
-            schemes=[settings.HASHING_ALGORITHM_LAYER_2], deprecated="auto"
-        )
+        from passlib.context import CryptContext
+
+        self._hash_ctx_layer_1 = CryptContext(schemes=[settings.HASHING_ALGORITHM_LAYER_1], deprecated="auto")
+        self._hash_ctx_layer_2 = CryptContext(schemes=[settings.HASHING_ALGORITHM_LAYER_2], deprecated="auto")
         self._hash_ctx_salt: str = settings.HASHING_SALT
 
     @property
@@ -45,36 +55,222 @@ class HashGenerator:
         the correct password."""
         return self._hash_ctx_layer_2.verify(secret=hash_salt + password, hash=hashed_password)
 
+    def load_backends(self) -> None:
+        """Load the hashing backends now instead of on the first hash."""
+        for context in (self._hash_ctx_layer_1, self._hash_ctx_layer_2):
+            handler = context.handler()
+            if hasattr(handler, "get_backend"):
+                handler.get_backend()
+
 
+@lru_cache()
 def get_hash_generator() -> HashGenerator:
     return HashGenerator()
 
 
-hash_generator: HashGenerator = get_hash_generator()
+def _generate_salt() -> str:
+    return get_hash_generator().generate_password_salt_hash
+
+
+def _make_password(password: str, hash_salt: str) -> str:
+    return get_hash_generator().generate_password_hash(hash_salt=hash_salt, password=password)
+
+
+def _verify_password(password: str, hash_salt: str, hashed_password: str) -> bool:
+    return get_hash_generator().is_password_verified(
+        password=password, hash_salt=hash_salt, hashed_password=hashed_password
+    )
+
+
+class HashingPool:
+    """Bounded executor that keeps password hashing off the event loop.
+
+    At most `workers` hashes run at the same time, the rest wait for a free
+    worker and are counted by `queue_depth`. The bcrypt and Argon2 backends
+    release the GIL, so a thread pool already scales with cores; a process
+    pool can be used for backends that don't.
+    """
+
+    def __init__(self, *, pool_type: HashingPoolType = HashingPoolType.THREAD, workers: int = 0, max_queue: int = 0):
+        self.pool_type = pool_type
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.queue_depth = 0
+        self.in_flight = 0
+        self._executor: Union[Executor, None] = None
+        self._semaphore: Union[asyncio.Semaphore, None] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool_type == HashingPoolType.PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hashing")
+        return self._executor
+
+    async def run(self, func: Callable[..., ResultType], *args: Any) -> ResultType:
+        if self.max_queue and self.queue_depth >= self.max_queue:
+            raise ServerException(
+                message="Server is busy, try again later.",
+                code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                status=ClientEndStatus.ERROR,
+            )
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        self.queue_depth += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "in_flight": self.in_flight, "queue_depth": self.queue_depth}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._semaphore = None
+
+
+@lru_cache()
+def get_hashing_pool() -> HashingPool:
+    return HashingPool(
+        pool_type=settings.HASHING_POOL_TYPE,
+        workers=settings.HASHING_POOL_WORKERS,
+        max_queue=settings.HASHING_POOL_MAX_QUEUE,
+    )
 
 
 class PasswordManager:
     @staticmethod
     def generate_salt() -> str:
-        return hash_generator.generate_password_salt_hash
+        return get_hash_generator().generate_password_salt_hash
 
     @staticmethod
     def make_password(*, password: str, hash_salt: str) -> str:
-        return hash_generator.generate_password_hash(hash_salt=hash_salt, password=password)
+        return get_hash_generator().generate_password_hash(hash_salt=hash_salt, password=password)
 
     @staticmethod
     def verify_password(*, password: str, hash_salt: str, hashed_password: str) -> bool:
-        return hash_generator.is_password_verified(
+        return get_hash_generator().is_password_verified(
             password=password,
             hash_salt=hash_salt,
             hashed_password=hashed_password,
         )
 
+    @staticmethod
+    async def generate_salt_async() -> str:
+        return await get_hashing_pool().run(_generate_salt)
+
+    @staticmethod
+    async def make_password_async(*, password: str, hash_salt: str) -> str:
+        return await get_hashing_pool().run(_make_password, password, hash_salt)
+
+    @staticmethod
+    async def verify_password_async(*, password: str, hash_salt: str, hashed_password: str) -> bool:
+        return await get_hashing_pool().run(_verify_password, password, hash_salt, hashed_password)
+
     @staticmethod
     def generate_password(*, length: int = 8) -> str:
         return secrets.token_urlsafe(nbytes=length)
 
 
+JOSE_CLAIMS: Tuple[str, ...] = ("aud", "exp", "iat", "iss", "nbf", "sub", "jti", "at_hash")
+
+
+def get_decode_options(options: TokenOptionsSchema, leeway: int, verify_aud: bool = True) -> Dict[str, Any]:
+    """Translate TokenOptionsSchema to python-jose `options` for `jwt.decode`."""
+    decode_options: Dict[str, Any] = options.dict(exclude={"require"})
+    decode_options.update({f"require_{claim}": claim in options.require for claim in JOSE_CLAIMS})
+    if not verify_aud:
+        # `require_aud` would switch `verify_aud` back on inside python-jose
+        decode_options["verify_aud"] = decode_options["require_aud"] = False
+    decode_options["leeway"] = leeway
+    return decode_options
+
+
+DEFAULT_TOKEN_OPTIONS: TokenOptionsSchema = TokenOptionsSchema()
+DEFAULT_DECODE_OPTIONS: Dict[Tuple[int, bool], Dict[str, Any]] = {
+    (0, True): get_decode_options(DEFAULT_TOKEN_OPTIONS, leeway=0),
+    (0, False): get_decode_options(DEFAULT_TOKEN_OPTIONS, leeway=0, verify_aud=False),
+}
+
+
+class VerifiedTokenCache:
+    """LRU cache of the claims of tokens that passed verification.
+
+    Entries are keyed by a digest of the token together with everything
+    that took part in verifying it, and are only served while the token is
+    valid: never after `exp` and never before `nbf` (both widened by the
+    leeway the token was verified with). Tokens without `exp` are not
+    cached.
+    """
+
+    def __init__(self, *, max_size: int = 10_000, clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, float, Payload]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(code: str, *parts: Any) -> bytes:
+        digest = hashlib.blake2b(code.encode(encoding="utf-8"), digest_size=20)
+        digest.update(repr(parts).encode(encoding="utf-8"))
+        return digest.digest()
+
+    def get(self, key: bytes) -> Union[Payload, None]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            not_before, valid_until, payload = entry
+            now = self._clock()
+            if not_before <= now < valid_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload.copy()
+            del self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def set(self, key: bytes, payload: Payload, *, leeway: int = 0) -> None:
+        if not self.max_size or not isinstance(payload.get("exp"), (int, float)):
+            return
+
+        nbf = payload.get("nbf")
+        not_before = nbf - leeway if isinstance(nbf, (int, float)) else float("-inf")
+        self._entries[key] = (not_before, payload["exp"] + leeway, payload.copy())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+@lru_cache()
+def get_verified_token_cache() -> VerifiedTokenCache:
+    return VerifiedTokenCache(max_size=settings.TOKEN_CACHE_SIZE)
+
+
 class TokenManager:
     @staticmethod
     def create_code(
@@ -84,8 +280,11 @@ class TokenManager:
         iat: DatetimeOrNone = None,
         exp: DatetimeOrNone = None,
         nbf: DatetimeOrNone = None,
-        iss: str = settings.TOKEN_ISSUER,
+        iss: Union[str, None] = None,
+        jti: Union[str, None] = None,
     ) -> str:
+        from jose import jwt
+
         if data is None:
             data = {}
 
@@ -101,31 +300,67 @@ class TokenManager:
             nbf = now
 
         payload = data.copy()
-        payload |= {"iat": iat, "aud": aud.value, "exp": exp, "nbf": nbf, "iss": iss}
-        return jwt.encode(payload=payload, key=settings.JWT_SECRET_KEY, algorithm=settings.TOKEN_ALGORITHM)
+        payload |= {
+            "iat": iat,
+            "aud": aud.value,
+            "exp": exp,
+            "nbf": nbf,
+            "iss": iss or settings.TOKEN_ISSUER,
+            "jti": jti or id_v4(),
+        }
+        return jwt.encode(claims=payload, key=settings.JWT_SECRET_KEY, algorithm=settings.TOKEN_ALGORITHM)
+
+    @staticmethod
+    def _validate_audiences(payload: Payload, audiences: Sequence[str]) -> None:
+        from jose.exceptions import JWTClaimsError
+
+        claim = payload.get("aud")
+        claimed = {claim} if isinstance(claim, str) else set(claim or ())
+        if claimed.isdisjoint(audiences):
+            raise JWTClaimsError("Invalid audience")
 
     @staticmethod
     def read_code(
         *,
         code: str,
         aud: Union[TokenAudience, Sequence[TokenAudience]] = TokenAudience.ACCESS,
-        iss: str = settings.TOKEN_ISSUER,
+        iss: Union[str, None] = None,
         leeway: int = 0,
         convert_to: Union[Type[BaseModel], None] = None,
         options: Union[TokenOptionsSchema, None] = None,
     ):
+        from jose import JWTError, jwt
+
+        iss = iss or settings.TOKEN_ISSUER
+        # python-jose accepts a single audience only, a set of audiences is checked after decoding
+        if isinstance(aud, (set, list, tuple)):
+            audience: Union[str, None] = None
+            audiences: Union[Tuple[str, ...], None] = tuple(sorted(item.value for item in aud))
+        else:
+            audience, audiences = aud.value, None
+
+        token_options = options or DEFAULT_TOKEN_OPTIONS
+        single_audience = audiences is None
+        decode_options = None if options else DEFAULT_DECODE_OPTIONS.get((leeway, single_audience))
+        if decode_options is None:
+            decode_options = get_decode_options(token_options, leeway=leeway, verify_aud=single_audience)
+        verified_token_cache = get_verified_token_cache()
+        cache_key = verified_token_cache.make_key(code, audience, audiences, iss, leeway, options)
+
         try:
-            options = options or TokenOptionsSchema()
-            audience = [item.value for item in aud] if isinstance(aud, (set, list, tuple)) else aud.value
-
-            payload: Dict[str, Union[int, float, str, dict, list, bool]] = jwt.decode(
-                jwt=code,
-                key=settings.JWT_SECRET_KEY,
-                algorithm=settings.TOKEN_ALGORITHM,
-                audience=audience,
-                issuer=iss,
-                options=options.dict().update({"leeway": leeway}),
-            )
+            payload = verified_token_cache.get(cache_key)
+            if payload is None:
+                payload = jwt.decode(
+                    token=code,
+                    key=settings.JWT_SECRET_KEY,
+                    algorithms=[settings.TOKEN_ALGORITHM],
+                    audience=audience,
+                    issuer=iss,
+                    options=decode_options,
+                )
+                if not single_audience and token_options.verify_aud:
+                    TokenManager._validate_audiences(payload, audiences)
+                verified_token_cache.set(cache_key, payload, leeway=leeway)
 
             if convert_to:
                 payload = convert_to(**payload)
@@ -133,3 +368,28 @@ class TokenManager:
             raise ServerException(message=error.args[0]) from error
         else:
             return payload
+
+    @staticmethod
+    async def read_code_async(
+        *,
+        code: str,
+        aud: Union[TokenAudience, Sequence[TokenAudience]] = TokenAudience.ACCESS,
+        iss: Union[str, None] = None,
+        leeway: int = 0,
+        convert_to: Union[Type[BaseModel], None] = None,
+        options: Union[TokenOptionsSchema, None] = None,
+    ):
+        """`read_code` that also rejects revoked tokens when `REVOCATION_ENABLED`,
+        the way request handlers should read tokens."""
+        payload = TokenManager.read_code(code=code, aud=aud, iss=iss, leeway=leeway, options=options)
+        if settings.REVOCATION_ENABLED:
+            await get_revocation_list().ensure_not_revoked(payload)
+        return convert_to(**payload) if convert_to else payload
+
+
+def warm_up() -> None:
+    """Import the token library and load the hashing backends, meant to run
+    at startup so that the first request doesn't pay for them."""
+    import jose.jwt  # noqa: F401
+
+    get_hash_generator().load_backends()
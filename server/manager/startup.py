@@ -0,0 +1,69 @@
+import asyncio
+import importlib
+import re
+import time
+from typing import Any, Dict, List, NamedTuple
+
+from server.config.factory import get_settings
+from server.manager.db import get_engine
+from server.manager.security import warm_up as warm_up_security
+
+# modules that are imported on first use by the application code
+LAZY_MODULES = ("phonenumbers",)
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+class ImportTime(NamedTuple):
+    """One line of `python -X importtime` output, times in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def warm_up() -> None:
+    """Build what is deferred at import time (settings, engine, hashing and
+    token backends, lazily imported libraries) before serving requests."""
+    get_settings()
+    get_engine()
+    warm_up_security()
+    for module in LAZY_MODULES:
+        importlib.import_module(module)
+
+
+def parse_import_times(output: str) -> List[ImportTime]:
+    result = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            result.append(ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return result
+
+
+async def _request(app: Any, path: str) -> Dict[str, float]:
+    import httpx
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup-profile") as client:
+            response = await client.get(path)
+            response.raise_for_status()
+        answered = time.perf_counter()
+    return {"startup_ms": (ready - started) * 1000, "first_request_ms": (answered - ready) * 1000}
+
+
+def measure_first_request(app_path: str = "server.main:app", path: str = "/health") -> Dict[str, float]:
+    """Time the import of the application, its lifespan startup and the
+    first request served in-process; meant to run in a fresh interpreter."""
+    started = time.perf_counter()
+    module, _, attribute = app_path.partition(":")
+    app = getattr(importlib.import_module(module), attribute)
+    imported = time.perf_counter()
+
+    timings = {"import_ms": (imported - started) * 1000, **asyncio.run(_request(app, path))}
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    return timings
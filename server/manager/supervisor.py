@@ -0,0 +1,106 @@
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from typing import Any, Dict, Union
+
+import uvicorn
+
+logger = logging.getLogger("uvicorn.error")
+
+# a worker that dies sooner than this after being started is restarted with a delay, so a broken app can't fork-loop
+MIN_WORKER_LIFETIME = 1.0
+
+
+def get_worker_count(workers: Union[int, str]) -> int:
+    """Resolve `auto` to the number of usable CPU cores (the affinity mask
+    when the platform has one, so container CPU sets are respected)."""
+    if str(workers).lower() != "auto":
+        return max(1, int(workers))
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+class PreforkSupervisor:
+    """Pre-fork process manager for uvicorn workers.
+
+    The application is imported and the listening socket bound once in the
+    supervisor, workers are forked from it, so they start with every module
+    already loaded (shared copy-on-write) and an import error stops the
+    server before any worker exists. A worker that exits, e.g. after
+    `limit_max_requests` (spread by `max_requests_jitter` so that workers
+    don't recycle at once), is replaced by a fresh one. SIGINT/SIGTERM are
+    forwarded to the workers, which finish their in-flight requests before
+    exiting.
+    """
+
+    def __init__(self, config: uvicorn.Config, *, workers: int, max_requests_jitter: int = 0):
+        self.config = config
+        self.workers = workers
+        self.max_requests_jitter = max_requests_jitter
+        self.should_exit = False
+        self.children: Dict[int, float] = {}
+        self._socket: Union[socket.socket, None] = None
+
+    def run(self) -> None:
+        self.config.load()
+        self._socket = self.config.bind_socket()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.handle_exit)
+
+        logger.info("Started supervisor [%d] with %d workers", os.getpid(), self.workers)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            started_at = self.children.pop(pid, None)
+            if started_at is None or self.should_exit:
+                continue
+
+            logger.info("Worker [%d] exited with status %d, starting a new one", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started_at < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not self.should_exit:
+                self.spawn()
+
+        self._socket.close()
+        logger.info("Stopped supervisor [%d]", os.getpid())
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        exit_code = 0
+        try:
+            self.run_worker()
+        except BaseException:
+            logger.exception("Worker [%d] crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def run_worker(self) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, signal.SIG_DFL)
+
+        if self.config.limit_max_requests and self.max_requests_jitter:
+            self.config.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        uvicorn.Server(config=self.config).run(sockets=[self._socket])
+
+    def handle_exit(self, sig: int, frame: Any) -> None:
+        self.should_exit = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -1,15 +1,22 @@
 import re
 from datetime import datetime
-from typing import Callable, Dict, Generator, TypeAlias, TypeVar, Union
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generator, Iterable, List, Tuple, TypeAlias, TypeVar, Union
 from uuid import UUID
 
-import phonenumbers
-from phonenumbers.phonenumberutil import NumberParseException
 from pydantic import BaseModel, EmailStr
-from pydantic.datetime_parse import parse_datetime
+from pydantic.datetime_parse import MS_WATERSHED, parse_datetime
+from pydantic.networks import import_email_validator
+from pydantic.validators import str_validator
 
 from server.manager.utils import as_utc, get_timestamp, get_utc_timezone
 
+PHONE_PATTERN = re.compile(r"^\d{8,15}$")
+PHONE_CACHE_SIZE = 65_536
+EMAIL_CACHE_SIZE = 65_536
+# beyond this many seconds from epoch pydantic clamps to datetime.max/min, leave those to the full parser
+MAX_FAST_UNIX_SECONDS = 253_402_300_799
+
 ObjectsVar = TypeVar("ObjectsVar", bound=Dict[str, Union[None, int, float, str, dict, list]])
 StrOrNone: TypeAlias = Union[str, None]
 SchemaType = TypeVar("SchemaType", bound=BaseModel)
@@ -35,13 +42,75 @@ class StringUUID(str):
             return str(result)
 
 
+class NativeUUID(UUID):
+    """UUID kept as `uuid.UUID` (16 bytes, bound natively to `uuid`
+    columns), it's only turned into a string when serialized to JSON."""
+
+    @classmethod
+    def __get_validators__(cls) -> Generator[Callable[[Any], UUID], None, None]:
+        """Run validate class method."""
+        yield cls.validate
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        field_schema.update(type="string", format="uuid")
+
+    @classmethod
+    def validate(cls, v: Any) -> UUID:
+        """Validate UUID object, string or 16 bytes."""
+        if isinstance(v, UUID):
+            return v
+
+        try:
+            return UUID(bytes=v) if isinstance(v, bytes) and len(v) == 16 else UUID(v)
+        except (TypeError, ValueError, AttributeError) as error:
+            raise ValueError("Invalid UUID") from error
+
+
+def validate_many(validator: Callable[[Any], Any], values: Iterable[Any]) -> List[Any]:
+    """Run a validator over many values, errors point at the failing
+    index."""
+    result = []
+    append = result.append
+    for index, value in enumerate(values):
+        try:
+            append(validator(value))
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Invalid value at index {index}: {error}") from error
+    return result
+
+
 class Timestamp(float):
     @classmethod
     def __get_validators__(cls) -> Generator[Callable[[str], str], None, None]:
-        """Run validation class methods."""
-        yield parse_datetime
-        yield cls.ensure_has_timezone
-        yield cls.to_timestamp
+        """Run validate class method."""
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v: Any) -> Union[float, int]:
+        """Convert datetime, unix time (seconds or milliseconds) or ISO-8601
+        values to a millisecond timestamp.
+
+        Datetime objects and numbers skip the string parser, everything else
+        goes through `parse_datetime` -> `ensure_has_timezone` ->
+        `to_timestamp`.
+        """
+        if isinstance(v, datetime):
+            return get_timestamp(v if v.tzinfo is not None else v.replace(tzinfo=get_utc_timezone()))
+
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            seconds = float(v)
+            while abs(seconds) > MS_WATERSHED:
+                seconds /= 1000
+            if abs(seconds) <= MAX_FAST_UNIX_SECONDS:
+                # same microsecond precision as a datetime built from the value
+                return round(round(seconds, 6) * 1000, 3)
+
+        return cls.to_timestamp(cls.ensure_has_timezone(parse_datetime(v)))
+
+    @classmethod
+    def validate_many(cls, values: Iterable[Any]) -> List[Union[float, int]]:
+        return validate_many(cls.validate, values)
 
     @classmethod
     def ensure_has_timezone(cls, v: datetime) -> datetime:
@@ -70,21 +139,41 @@ class Phone(str):
 
     @classmethod
     def validate(cls, v: str) -> str:
+        if not isinstance(v, str):
+            raise TypeError("string required")
+
+        is_valid, result = cls._parse(v)
+        if not is_valid:
+            raise ValueError(result)
+        return result
+
+    @staticmethod
+    @lru_cache(maxsize=PHONE_CACHE_SIZE)
+    def _parse(v: str) -> Tuple[bool, str]:
+        """Parse the phone number once per distinct value, returns the
+        normalized number or the error message."""
+        # phonenumbers loads its metadata on import, it's only paid for once a phone number is validated
+        import phonenumbers
+        from phonenumbers.phonenumberutil import NumberParseException
+
         prefix = "+"
-        if not re.match(r"^\d{8,15}$", v):
-            raise ValueError("Must be digits")
+        if not PHONE_PATTERN.match(v):
+            return False, "Must be digits"
 
         try:
-            v = "".join((digit for digit in v if digit.isdigit()))  # format phone (allow only digits)
-            v = prefix + v
+            # `$` also matches before a trailing newline, the number is kept to its digits like before
+            v = prefix + "".join(digit for digit in v if digit.isdigit())
             parsed_phone = phonenumbers.parse(v, None)
-        except NumberParseException as error:
-            raise ValueError("Invalid phone number") from error
-        else:
-            if phonenumbers.is_possible_number(parsed_phone):
-                return v.removeprefix(prefix)
+        except NumberParseException:
+            return False, "Invalid phone number"
 
-        raise ValueError("Impossible Number")
+        if phonenumbers.is_possible_number(parsed_phone):
+            return True, v.removeprefix(prefix)
+        return False, "Impossible Number"
+
+    @classmethod
+    def validate_many(cls, values: Iterable[str]) -> List[str]:
+        return validate_many(cls.validate, values)
 
     @classmethod
     def __modify_schema__(cls, field_schema: dict) -> None:
@@ -102,9 +191,26 @@ class Email(EmailStr):
 
     @classmethod
     def __get_validators__(cls) -> Generator[Callable[[str], str], None, None]:
-        """Add extra validator to Pydantic EmailStr field."""
-        yield from super().__get_validators__()
-        yield cls.lowercase
+        """Validate with Pydantic EmailStr rules and lowercase the value."""
+        import_email_validator()
+
+        yield str_validator
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: str) -> str:
+        """EmailStr validation with successful results cached per distinct
+        value, invalid values are checked again every time."""
+        return cls._validate_cached(value)
+
+    @staticmethod
+    @lru_cache(maxsize=EMAIL_CACHE_SIZE)
+    def _validate_cached(value: str) -> str:
+        return Email.lowercase(EmailStr.validate(value))
+
+    @classmethod
+    def validate_many(cls, values: Iterable[str]) -> List[str]:
+        return validate_many(lambda value: cls.validate(str_validator(value)), values)
 
     @classmethod
     def lowercase(cls, v: str) -> str:
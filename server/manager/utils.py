@@ -1,12 +1,16 @@
-from datetime import date, datetime
-from functools import lru_cache, partial
-from typing import Any, Callable, Dict
-from uuid import uuid1, uuid4
+import os
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Tuple, Type, Union
+from uuid import UUID, uuid1, uuid4
 from zoneinfo import ZoneInfo
 
 import orjson
-from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
 from pydash import camel_case
+from sqlalchemy import Row
 
 
 @lru_cache()
@@ -35,6 +39,40 @@ def id_v4() -> str:
     return str(uuid4())
 
 
+# 74 bits after the timestamp: 12 of rand_a and 62 of rand_b, version and variant bits are set around them
+V7_RANDOM_BITS = 74
+V7_VERSION_AND_VARIANT = (0x7 << 76) | (0b10 << 62)
+_v7_lock = threading.Lock()
+_v7_state = [0, 0]
+
+
+def id_v7() -> UUID:
+    """Generate UUID with version 7 (RFC 9562): unix time in milliseconds
+    followed by random bits, so new ids land at the right edge of a B-tree
+    index instead of on random pages.
+
+    Ids are monotonic within the process: in the same millisecond (or if
+    the clock goes back) the random part of the previous id is incremented,
+    its top bit starts cleared so that increments hardly ever overflow into
+    the next millisecond.
+    """
+    with _v7_lock:
+        milliseconds = time.time_ns() // 1_000_000
+        last_milliseconds, tail = _v7_state
+        if milliseconds > last_milliseconds:
+            tail = int.from_bytes(os.urandom(10), "big") >> (80 - V7_RANDOM_BITS + 1)
+        else:
+            milliseconds, tail = last_milliseconds, tail + 1
+            if tail >> V7_RANDOM_BITS:
+                milliseconds, tail = milliseconds + 1, int.from_bytes(os.urandom(10), "big") >> (
+                    80 - V7_RANDOM_BITS + 1
+                )
+        _v7_state[0], _v7_state[1] = milliseconds, tail
+
+    value = (milliseconds << 80) | ((tail >> 62) << 64) | (tail & ((1 << 62) - 1)) | V7_VERSION_AND_VARIANT
+    return UUID(int=value)
+
+
 def orjson_dumps(v: Any, *, default: Any) -> str:
     # orjson.dumps returns bytes, to match standard json.dumps we need to decode
     return orjson.dumps(v, default=default).decode(encoding="utf-8")
@@ -51,18 +89,70 @@ def proxy_func(x: Any) -> Any:
     return x
 
 
+@lru_cache(maxsize=None)
 def to_camel_case(key: str) -> str:
     return camel_case(key)
 
 
-encodings_dict: Dict[Any, Callable[[Any], Any]] = {
-    datetime: proxy_func,  # don't transform datetime objects
-    date: proxy_func,  # don't transform date objects
-}
+@lru_cache(maxsize=None)
+def get_alias_map(schema: Type[BaseModel]) -> Dict[str, str]:
+    """Field name to alias map of the schema, computed once per class."""
+    return {name: field.alias for name, field in schema.__fields__.items()}
+
+
+class KeyTransformer:
+    """Rewrites the keys of many rows with a precomputed key table.
+
+    Each distinct key is transformed once and each distinct set of keys
+    (i.e. each query shape) is mapped once, so rewriting a row is a single
+    `zip` with no per-row string processing.
+    """
+
+    def __init__(self, transform: Callable[[str], str] = to_camel_case, table: Union[Mapping[str, str], None] = None):
+        self.transform = transform
+        self.table: Dict[str, str] = dict(table or {})
+        self._shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def key(self, key: str) -> str:
+        transformed = self.table.get(key)
+        if transformed is None:
+            transformed = self.table[key] = self.transform(key)
+        return transformed
+
+    def _target_keys(self, keys: Tuple[str, ...]) -> Tuple[str, ...]:
+        target = self._shapes.get(keys)
+        if target is None:
+            target = self._shapes[keys] = tuple(self.key(key) for key in keys)
+        return target
+
+    def __call__(self, rows: Iterable[Union[Mapping[str, Any], Row]]) -> List[Dict[str, Any]]:
+        result = []
+        for row in rows:
+            if isinstance(row, Row):
+                keys, values = tuple(row._fields), row
+            else:
+                keys, values = tuple(row), row.values()
+            result.append(dict(zip(self._target_keys(keys), values)))
+        return result
+
+
+camel_case_transformer = KeyTransformer()
+
+
+@lru_cache(maxsize=None)
+def get_schema_transformer(schema: Type[BaseModel]) -> KeyTransformer:
+    return KeyTransformer(table=get_alias_map(schema))
+
+
+def camelize_rows(
+    rows: Iterable[Union[Mapping[str, Any], Row]],
+    *,
+    schema: Union[Type[BaseModel], None] = None,
+) -> List[Dict[str, Any]]:
+    """Rewrite row keys to camelCase without building models.
 
-to_db_encoder = partial(
-    jsonable_encoder,
-    exclude_unset=True,
-    by_alias=False,
-    custom_encoder=encodings_dict,  # override `jsonable_encoder` default behaviour
-)
+    With `schema` the keys follow its field aliases (so raw SQL responses
+    match the schema output), other keys are camel cased.
+    """
+    transformer = camel_case_transformer if schema is None else get_schema_transformer(schema)
+    return transformer(rows)
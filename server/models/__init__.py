@@ -0,0 +1,2 @@
+# import every models module so that `Base.metadata` is complete for Alembic
+from server.models import assignees, projects, ratelimit, stats, tasks, tokens  # noqa: F401
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, String, Uuid, func
+
+from server.manager.db import Base
+from server.manager.utils import id_v7
+
+
+class Assignee(Base):
+    """Person tasks are assigned to."""
+
+    __tablename__ = "assignees"
+
+    id = Column(Uuid, primary_key=True, default=id_v7, server_default=func.uuid_generate_v7())
+    name = Column(String(255), nullable=False)
+    email = Column(String(255), nullable=True, unique=True, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, String, Uuid, func
+
+from server.manager.db import Base
+from server.manager.utils import id_v7
+
+
+class Project(Base):
+    """Group of tasks."""
+
+    __tablename__ = "projects"
+
+    id = Column(Uuid, primary_key=True, default=id_v7, server_default=func.uuid_generate_v7())
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
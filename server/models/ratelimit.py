@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Boolean, Column, Double, Identity, Index, String
+
+from server.manager.db import Base
+
+
+class RateLimitBucket(Base):
+    """Token bucket state shared by all workers, times are epoch seconds of
+    the database clock."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Double, nullable=False)
+    allowed = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(Double, nullable=False, index=True)
+
+
+class RateLimitHit(Base):
+    """One accepted request of a sliding window log."""
+
+    __tablename__ = "rate_limit_hits"
+    __table_args__ = (Index("ix_rate_limit_hits_key_hit_at", "key", "hit_at"),)
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    key = Column(String(255), nullable=False)
+    hit_at = Column(Double, nullable=False)
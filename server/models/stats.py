@@ -0,0 +1,42 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, Uuid
+
+from server.manager.db import Base
+
+
+class TaskStats(Base):
+    """Tasks created and completed per project and time bucket.
+
+    One row per rollup period (`RatePeriod` value) and bucket start
+    (`date_trunc` in UTC), tasks without a project are counted under the
+    nil UUID so that every row has a key to merge deltas on.
+    """
+
+    __tablename__ = "task_stats"
+    __table_args__ = (Index("ix_task_stats_period_project_id_bucket", "period", "project_id", "bucket"),)
+
+    period = Column(String(10), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    project_id = Column(Uuid, primary_key=True)
+    created = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class TaskStatsEntry(Base):
+    """What a task currently contributes to `task_stats`, so that the
+    contribution of its previous values can be taken back when it changes."""
+
+    __tablename__ = "task_stats_entries"
+
+    task_id = Column(Uuid, primary_key=True)
+    project_id = Column(Uuid, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class RollupWatermark(Base):
+    """Latest source row change folded into a rollup."""
+
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,80 @@
+from sqlalchemy import Column, Computed, DateTime, ForeignKey, Index, SmallInteger, String, Text, Uuid, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+
+from server.manager.db import Base
+from server.manager.enums import TaskStatus
+from server.manager.utils import id_v7
+
+OPEN_STATUSES = (TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value)
+# text search configuration of `search_vector`, queries have to use the same one
+SEARCH_CONFIG = "english"
+
+
+class Task(Base):
+    """Unit of work tracked through its lifecycle.
+
+    `external_id` is the identifier in the tracker a task was imported
+    from, bulk imports merge on it. Indexes follow the list queries: an
+    assignee's tasks by status and due date (the partial index holds open
+    tasks only, the hottest of them), a project's tasks by last update and
+    tasks by status and creation. The statistics rollup reads the tasks
+    changed since its watermark by `updated_at`, the scheduler the open
+    tasks by due date.
+
+    `reminded_for` and `overdue_for` hold the due date the reminder and
+    the overdue transition fired for, a new due date makes them pending
+    again.
+
+    `search_vector` is maintained by PostgreSQL from the title (weight A)
+    and description (weight B) for full-text search; it isn't loaded with
+    the task. Trigram indexes back `like`/`ilike`/`endswith` filters on
+    title and description, which a B-tree can't serve.
+    """
+
+    __tablename__ = "tasks"
+
+    id = Column(Uuid, primary_key=True, default=id_v7, server_default=func.uuid_generate_v7())
+    external_id = Column(String(255), nullable=True, unique=True, index=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False, default=TaskStatus.TODO.value, server_default=TaskStatus.TODO.value)
+    priority = Column(SmallInteger, nullable=False, default=0, server_default="0")
+    project_id = Column(Uuid, ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    assignee_id = Column(Uuid, ForeignKey("assignees.id", ondelete="SET NULL"), nullable=True)
+    due_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    reminded_for = Column(DateTime(timezone=True), nullable=True)
+    overdue_for = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True
+    )
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                (
+                    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')"
+                    f" || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+                ),
+                persisted=True,
+            ),
+        )
+    )
+
+    __table_args__ = (
+        Index("ix_tasks_assignee_id_status_due_at", assignee_id, status, due_at),
+        Index("ix_tasks_open_assignee_id_due_at", assignee_id, due_at, id, postgresql_where=status.in_(OPEN_STATUSES)),
+        Index("ix_tasks_open_due_at", due_at, postgresql_where=status.in_(OPEN_STATUSES)),
+        Index("ix_tasks_project_id_updated_at_id", project_id, updated_at, id),
+        Index("ix_tasks_status_created_at_id", status, created_at, id),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_tasks_title_trgm", title, postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index(
+            "ix_tasks_description_trgm",
+            description,
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, String, func
+
+from server.manager.db import Base
+
+
+class RevokedToken(Base):
+    """JWT revoked before its expiry, identified by its `jti` claim."""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -0,0 +1,35 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.manager.db import get_read_session
+from server.manager.limiter import get_rate_limiter
+from server.manager.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from server.manager.responses import EnvelopeResponse
+from server.manager.schemas import ClientOutSchema, CursorPaginationOutSchema
+from server.manager.types import StrOrNone
+from server.routes.tasks import project_task_paginator, project_task_statement
+from server.schemas.tasks import TaskOutSchema
+
+router = APIRouter(prefix="/projects", tags=["projects"], dependencies=[Depends(get_rate_limiter())])
+
+
+@router.get(
+    "/{project_id}/tasks",
+    response_model=ClientOutSchema[CursorPaginationOutSchema[TaskOutSchema]],
+    response_class=EnvelopeResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def list_project_tasks(
+    project_id: UUID,
+    cursor: StrOrNone = Query(default=None),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Tasks of a project, most recently updated first."""
+    page = await project_task_paginator.paginate(
+        session, project_task_statement, cursor=cursor, limit=limit, params={"project_id": project_id}
+    )
+    page.objects = TaskOutSchema.from_rows(page.objects, trusted=True)
+    return EnvelopeResponse(page.dict(), message="Project tasks.")
@@ -0,0 +1,288 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Union
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import REAL, String, bindparam, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.config.factory import settings
+from server.manager.db import get_read_session, get_read_session_factory
+from server.manager.enums import CountMode, ExportFormat, ImportFormat, RatePeriod
+from server.manager.exceptions import ServerException
+from server.manager.exporter import EXPORT_MEDIA_TYPES, gzip_stream, stream_rows
+from server.manager.filters import DEFAULT_RESERVED_PARAMS, FilterQuery, FilterSet
+from server.manager.importer import BulkImporter, get_import_format
+from server.manager.limiter import get_rate_limiter
+from server.manager.pagination import (
+    DEFAULT_LIMIT,
+    FORWARD,
+    MAX_LIMIT,
+    CachedCount,
+    KeysetPaginator,
+    count_total,
+    encode_cursor,
+)
+from server.manager.plans import PlanCheck
+from server.manager.responses import EnvelopeResponse
+from server.manager.rollups import ROLLUP_PERIODS, get_task_stats, get_watermark, truncate
+from server.manager.scheduler import get_task_scheduler, window_statement
+from server.manager.schemas import ClientOutSchema, CursorPaginationOutSchema, ImportReportOutSchema
+from server.manager.types import StrOrNone, Timestamp
+from server.manager.utils import utc_now
+from server.models.tasks import OPEN_STATUSES, SEARCH_CONFIG, Task
+from server.schemas.tasks import TaskImportSchema, TaskOutSchema, TaskSearchOutSchema, TaskStatsOutSchema
+
+router = APIRouter(prefix="/tasks", tags=["tasks"], dependencies=[Depends(get_rate_limiter())])
+
+MAX_STATS_BUCKETS = 1_000
+
+task_filters = FilterSet(
+    {
+        "status": Task.status,
+        "project": Task.project_id,
+        "assignee": Task.assignee_id,
+        "due": Task.due_at,
+        "created": Task.created_at,
+        "title": Task.title,
+        "description": Task.description,
+    },
+    reserved=DEFAULT_RESERVED_PARAMS | {"q", "format", "gzip"},
+)
+# statements are module level, built once rather than per request
+task_statement = select(Task)
+# the columns of the API, without the generated search vector
+task_columns = [column for column in Task.__table__.c if column.computed is None]
+task_export_statement = select(*task_columns).order_by(Task.created_at.desc(), Task.id.desc())
+task_paginator = KeysetPaginator(sort_column=Task.created_at, id_column=Task.id, descending=True)
+task_counts = CachedCount()
+# statuses are rendered inline, so that the planner can match the partial index on open tasks
+open_task_statement = select(Task).where(
+    Task.assignee_id == bindparam("assignee_id", type_=Task.assignee_id.type),
+    Task.status.in_(bindparam("open_statuses", OPEN_STATUSES, literal_execute=True)),
+)
+open_task_paginator = KeysetPaginator(sort_column=Task.due_at, id_column=Task.id)
+project_task_statement = select(Task).where(Task.project_id == bindparam("project_id", type_=Task.project_id.type))
+project_task_paginator = KeysetPaginator(sort_column=Task.updated_at, id_column=Task.id, descending=True)
+search_query = func.websearch_to_tsquery(
+    literal_column(f"'{SEARCH_CONFIG}'::regconfig"), bindparam("search_query", type_=String())
+)
+search_rank = func.ts_rank(Task.search_vector, search_query, type_=REAL).label("rank")
+task_search_statement = select(*task_columns, search_rank).where(Task.search_vector.bool_op("@@")(search_query))
+task_search_paginator = KeysetPaginator(sort_column=search_rank, id_column=Task.id, descending=True)
+
+
+@lru_cache()
+def get_task_importer() -> BulkImporter:
+    return BulkImporter(
+        table=Task.__table__,
+        schema=TaskImportSchema,
+        conflict_column="external_id",
+        chunk_size=settings.IMPORT_CHUNK_SIZE,
+        max_errors=settings.IMPORT_MAX_ERRORS,
+    )
+
+
+def get_plan_checks() -> Dict[str, PlanCheck]:
+    """First page of every task list query and a next page of the paginated
+    ones, with example filter and cursor values; see `manage.py
+    check-plans`."""
+    ident = UUID(int=0)
+    now = utc_now()
+    checks: Dict[str, PlanCheck] = {}
+    for name, filters in (
+        ("tasks", []),
+        ("tasks?status", [("status", "todo")]),
+        ("tasks?assignee", [("assignee", str(ident))]),
+        ("tasks?project", [("project", str(ident))]),
+        ("tasks?title", [("title__ilike", "%example%")]),
+        ("tasks?description", [("description__endswith", "example")]),
+    ):
+        query = task_filters.parse(filters)
+        checks[name] = PlanCheck(task_paginator.statement(query.apply(task_statement)), query.params)
+    query = task_filters.parse([("status", "todo")])
+    search_params = {**query.params, "search_query": "example"}
+    checks["tasks/search"] = PlanCheck(
+        task_search_paginator.statement(query.apply(task_search_statement)), search_params
+    )
+    checks["tasks/open"] = PlanCheck(open_task_paginator.statement(open_task_statement), {"assignee_id": ident})
+    checks["projects/tasks"] = PlanCheck(
+        project_task_paginator.statement(project_task_statement), {"project_id": ident}
+    )
+
+    cursor = encode_cursor(now, ident, FORWARD)
+    checks["tasks next"] = PlanCheck(
+        task_paginator.statement(task_statement, cursor=cursor), {}, seek_column=Task.created_at.key
+    )
+    # the rank is computed, search pages are filtered by it and only have to avoid sequential scans
+    checks["tasks/search next"] = PlanCheck(
+        task_search_paginator.statement(query.apply(task_search_statement), cursor=encode_cursor(0.1, ident, FORWARD)),
+        search_params,
+    )
+    checks["tasks/open next"] = PlanCheck(
+        open_task_paginator.statement(open_task_statement, cursor=cursor),
+        {"assignee_id": ident},
+        seek_column=Task.due_at.key,
+    )
+    checks["projects/tasks next"] = PlanCheck(
+        project_task_paginator.statement(project_task_statement, cursor=cursor),
+        {"project_id": ident},
+        seek_column=Task.updated_at.key,
+    )
+    checks["scheduler/window"] = PlanCheck(window_statement, {"due_from": now, "due_before": now, "limit": 1_000})
+    return checks
+
+
+@router.get(
+    "",
+    response_model=ClientOutSchema[CursorPaginationOutSchema[TaskOutSchema]],
+    response_class=EnvelopeResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def list_tasks(
+    filters: FilterQuery = Depends(task_filters),
+    cursor: StrOrNone = Query(default=None),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    total: Union[CountMode, None] = Query(
+        default=None, description="Add the total count, exact (cached for a minute) or a planner estimate."
+    ),
+    session: AsyncSession = Depends(get_read_session),
+):
+    statement = filters.apply(task_statement)
+    page = await task_paginator.paginate(session, statement, cursor=cursor, limit=limit, params=filters.params)
+    if total is not None:
+        page.total_count, page.total_count_is_estimate = await count_total(
+            session,
+            statement,
+            mode=total,
+            counter=task_counts,
+            key=filters.key,
+            params=filters.params,
+            table=None if filters.signature else Task.__table__,
+        )
+    page.objects = TaskOutSchema.from_rows(page.objects, trusted=True)
+    return EnvelopeResponse(page.dict(), message="Tasks.")
+
+
+@router.get(
+    "/open",
+    response_model=ClientOutSchema[CursorPaginationOutSchema[TaskOutSchema]],
+    response_class=EnvelopeResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def list_open_tasks(
+    assignee: UUID = Query(...),
+    cursor: StrOrNone = Query(default=None),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Open tasks of an assignee, soonest due first and tasks without a due
+    date last."""
+    page = await open_task_paginator.paginate(
+        session, open_task_statement, cursor=cursor, limit=limit, params={"assignee_id": assignee}
+    )
+    page.objects = TaskOutSchema.from_rows(page.objects, trusted=True)
+    return EnvelopeResponse(page.dict(), message="Open tasks.")
+
+
+@router.get(
+    "/search",
+    response_model=ClientOutSchema[CursorPaginationOutSchema[TaskSearchOutSchema]],
+    response_class=EnvelopeResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=256, description='Web search syntax: words, "phrases", or, -not.'),
+    filters: FilterQuery = Depends(task_filters),
+    cursor: StrOrNone = Query(default=None),
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Full-text search over task titles and descriptions, most relevant
+    first (title matches weigh more), combined with the list filters."""
+    page = await task_search_paginator.paginate(
+        session,
+        filters.apply(task_search_statement),
+        cursor=cursor,
+        limit=limit,
+        params={**filters.params, "search_query": q},
+        scalars=False,
+    )
+    page.objects = TaskSearchOutSchema.from_rows(page.objects, trusted=True)
+    return EnvelopeResponse(page.dict(), message="Tasks found.")
+
+
+@router.get(
+    "/stats",
+    response_model=ClientOutSchema[TaskStatsOutSchema],
+    response_class=EnvelopeResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_stats(
+    start: datetime = Query(..., description="ISO-8601 or unix time, rounded down to its bucket."),
+    end: Union[datetime, None] = Query(default=None, description="Excluded, now by default."),
+    period: RatePeriod = Query(default=RatePeriod.DAY),
+    project: Union[UUID, None] = Query(default=None),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Tasks created and completed per hour, day or week, served from the
+    statistics rollup so the cost follows the time range asked for."""
+    if period not in ROLLUP_PERIODS:
+        raise ServerException(message="Statistics are kept by hours, days or weeks.")
+    start = Timestamp.ensure_has_timezone(start)
+    end = Timestamp.ensure_has_timezone(end) if end is not None else utc_now()
+    if end <= start:
+        raise ServerException(message="The end of the range must be after its start.")
+    if (end - truncate(start, period)) / timedelta(**{period.value: 1}) > MAX_STATS_BUCKETS:
+        raise ServerException(message=f"At most {MAX_STATS_BUCKETS} buckets can be requested at once.")
+
+    buckets = await get_task_stats(session, period=period, start=start, end=end, project_id=project)
+    stats = TaskStatsOutSchema.from_trusted(
+        {"period": period, "project_id": project, "as_of": await get_watermark(session), "buckets": buckets}
+    )
+    return EnvelopeResponse(stats, message="Task statistics.")
+
+
+@router.get("/export", response_class=StreamingResponse, status_code=status.HTTP_200_OK)
+async def export_tasks(
+    filters: FilterQuery = Depends(task_filters),
+    export_format: ExportFormat = Query(default=ExportFormat.NDJSON, alias="format"),
+    gzip: bool = Query(default=False, description="Compress the response on the fly."),
+):
+    """Stream every task matching the filters as NDJSON or CSV, memory use
+    doesn't depend on the number of tasks."""
+    content = stream_rows(
+        filters.apply(task_export_statement),
+        params=filters.params,
+        export_format=export_format,
+        schema=TaskOutSchema,
+        yield_per=settings.EXPORT_YIELD_PER,
+        session_factory=get_read_session_factory(),
+    )
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{export_format.value}"'}
+    if gzip:
+        content = gzip_stream(content)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(content, media_type=EXPORT_MEDIA_TYPES[export_format], headers=headers)
+
+
+@router.post(
+    "/import",
+    response_model=ClientOutSchema[ImportReportOutSchema],
+    response_class=EnvelopeResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def import_tasks(
+    request: Request, import_format: Union[ImportFormat, None] = Query(default=None, alias="format")
+):
+    """Import tasks from an NDJSON or CSV request body (format taken from
+    the `format` parameter or the content type), tasks with a known
+    `external_id` are updated. The import is not atomic, records the
+    database rejects are reported and the others are still imported."""
+    import_format = import_format or get_import_format(content_type=request.headers.get("content-type"))
+    report = await get_task_importer().run(request.stream(), import_format=import_format)
+    if report.inserted or report.updated:
+        get_task_scheduler().request_sync()
+    return EnvelopeResponse(report.dict(), message="Tasks imported.")
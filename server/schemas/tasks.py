@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import List, Union
+
+from pydantic import Field, validator
+
+from server.manager.enums import RatePeriod, TaskStatus
+from server.manager.schemas import BaseInSchema, BaseOutSchema, OutputAliasConfig, WriteHistoryOutSchema
+from server.manager.types import NativeUUID, StrOrNone, Timestamp
+
+
+class TaskImportSchema(BaseInSchema):
+    """One task record of a bulk import."""
+
+    external_id: StrOrNone = Field(default=None, max_length=255, title="Id in the source tracker")
+    title: str = Field(default=..., min_length=1, max_length=255)
+    description: StrOrNone = Field(default=None)
+    status: TaskStatus = Field(default=TaskStatus.TODO)
+    priority: int = Field(default=0, ge=0, le=100)
+    project_id: Union[NativeUUID, None] = Field(default=None)
+    assignee_id: Union[NativeUUID, None] = Field(default=None)
+    due_at: Union[datetime, None] = Field(default=None)
+    completed_at: Union[datetime, None] = Field(default=None)
+
+    @validator("due_at", "completed_at")
+    def ensure_has_timezone(cls, v: Union[datetime, None]) -> Union[datetime, None]:
+        return Timestamp.ensure_has_timezone(v) if v is not None else v
+
+
+class TaskOutSchema(BaseOutSchema, WriteHistoryOutSchema):
+    """Task as returned by the API."""
+
+    id: NativeUUID
+    external_id: StrOrNone = Field(default=None, title="Id in the source tracker")
+    title: str
+    description: StrOrNone = Field(default=None)
+    status: TaskStatus
+    priority: int
+    project_id: Union[NativeUUID, None] = Field(default=None)
+    assignee_id: Union[NativeUUID, None] = Field(default=None)
+    due_at: Union[Timestamp, None] = Field(default=None, title="Due at")
+    completed_at: Union[Timestamp, None] = Field(default=None, title="Completed at")
+    reminded_for: Union[Timestamp, None] = Field(default=None, description="Due date the reminder was sent for.")
+    overdue_for: Union[Timestamp, None] = Field(default=None, description="Due date the task became overdue for.")
+
+
+class TaskSearchOutSchema(TaskOutSchema):
+    """Task matching a search, with its relevance."""
+
+    rank: float = Field(default=..., title="Relevance")
+
+
+class TaskStatsBucketOutSchema(BaseOutSchema, OutputAliasConfig):
+    """Tasks created and completed within one bucket."""
+
+    bucket: Timestamp = Field(default=..., title="Bucket start")
+    created: int = Field(default=0)
+    completed: int = Field(default=0)
+
+
+class TaskStatsOutSchema(BaseOutSchema, OutputAliasConfig):
+    """Task statistics over a time range, one bucket per period."""
+
+    period: RatePeriod
+    project_id: Union[NativeUUID, None] = Field(default=None, description="Project counted, all of them if empty.")
+    as_of: Union[Timestamp, None] = Field(default=None, description="Task changes up to this time are counted.")
+    buckets: List[TaskStatsBucketOutSchema] = Field(default=[])